@@ -4,7 +4,8 @@ import os
 from flask import Flask, jsonify
 
 from app.config import config
-from app.utils import register_flask_extensions
+from app.json_provider import create_json_provider
+from app.utils import register_blueprints, register_flask_extensions
 
 
 def create_app() -> Flask:
@@ -15,6 +16,7 @@ def create_app() -> Flask:
         Flask: A Flask object representing the API application.
     """
     app = Flask(__name__)
+    app.json = create_json_provider(app)
 
     # Set the configuration based on the environment variable
     config_name = os.environ.get("ENVIRONMENT", "development")
@@ -23,6 +25,7 @@ def create_app() -> Flask:
     print("API configuration:", app.config["ENV"])
 
     register_flask_extensions(app)
+    register_blueprints(app)
 
     @app.route("/")
     def index():
@@ -32,6 +32,32 @@ class Config(object):
         JWT_ACCESS_TOKEN_EXPIRES (timedelta): Expiry duration for access tokens.
         JWT_REFRESH_TOKEN_EXPIRES (timedelta): Expiry duration for refresh tokens.
         CORS_ORIGINS (List[str]): List of allowed CORS origins.
+        ORG_CHANGEFEED_ENABLED (bool): Run the per-worker LISTEN connection for org changes.
+        ORG_SNAPSHOT_MAX_AGE (int): Seconds after which the org snapshot is reloaded regardless.
+        ORG_STREAM_HEARTBEAT (int): Seconds between keepalive comments on the change stream.
+        ORG_STREAM_MAX_SECONDS (int): Seconds after which a change stream is closed.
+        ORG_STREAM_MAX_CONNECTIONS (int): Change streams one worker serves at once; each holds a thread.
+        ORG_STREAM_RETRY_AFTER (int): Seconds clients are asked to wait when all stream slots are taken.
+        ORG_HISTORY_SNAPSHOT_INTERVAL (int): Number of user changes between two full history snapshots.
+        ORG_ANALYTICS_VERIFY (bool): Check incremental analytics against a full recompute after every change.
+        COMPRESS_ALGORITHM (List[str]): Response codings offered by Flask-Compress, in order of preference.
+        COMPRESS_LEVEL (int): gzip level; the default of 6 trades little size for much less CPU than 9.
+        COMPRESS_BR_LEVEL (int): Brotli quality; 11 is far too slow for large dynamic payloads.
+        COMPRESS_MIN_SIZE (int): Responses smaller than this many bytes are sent uncompressed.
+        RATELIMIT_ENABLED (bool): Enforce rate limits and concurrency caps.
+        RATELIMIT_STORAGE_URL (str): Redis URL of the shared token buckets; per-worker buckets if unset.
+        RATELIMIT_STORAGE_TIMEOUT (float): Seconds to wait for Redis before falling back to per-worker buckets.
+        RATELIMIT_RETRY_INTERVAL (float): Seconds to skip Redis after it failed.
+        RATELIMIT_DEFAULT (Tuple[float, int]): Requests per second and burst allowed per client on all endpoints.
+        RATELIMIT_EXEMPT (Tuple[str]): Endpoints that are never limited.
+        RATELIMIT_BUCKET_SCALE (float): Multiplier of every bucket's rate and burst. Load tests send all
+            traffic from one address and raise it, so they measure the API rather than 429s.
+        JOBS_STORAGE_URL (str): Redis URL of the job queue; jobs run in the web workers if unset.
+        JOBS_RESULT_TTL (int): Seconds finished jobs and their results are kept.
+        JOBS_LOCAL_WORKERS (int): Threads running jobs in each web worker when there is no Redis.
+        JOBS_HEARTBEAT_INTERVAL (int): Seconds between heartbeats of running jobs.
+        JOBS_STALE_AFTER (int): Seconds without heartbeat after which a job is requeued.
+        JOBS_MAX_ATTEMPTS (int): How many times an abandoned job is started before it is failed.
 
     Methods:
         init_app(app: Flask) -> None: Initialize the Flask application.
@@ -48,6 +74,31 @@ class Config(object):
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=31)
     CORS_ORIGINS = ["http://localhost:5000", "http:127.0.0.1:5000", "http:0.0.0.0"]
+    ORG_CHANGEFEED_ENABLED = True
+    ORG_SNAPSHOT_MAX_AGE = 300
+    ORG_STREAM_HEARTBEAT = 15
+    ORG_STREAM_MAX_SECONDS = 300
+    ORG_STREAM_MAX_CONNECTIONS = 4
+    ORG_STREAM_RETRY_AFTER = 10
+    ORG_HISTORY_SNAPSHOT_INTERVAL = 1000
+    ORG_ANALYTICS_VERIFY = False
+    COMPRESS_ALGORITHM = ["br", "gzip"]
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_LEVEL = 4
+    COMPRESS_MIN_SIZE = 1024
+    RATELIMIT_ENABLED = True
+    RATELIMIT_STORAGE_URL = os.environ.get("REDIS_URL")
+    RATELIMIT_STORAGE_TIMEOUT = 0.05
+    RATELIMIT_RETRY_INTERVAL = 5
+    RATELIMIT_DEFAULT = (20, 100)
+    RATELIMIT_EXEMPT = ("health_check",)
+    RATELIMIT_BUCKET_SCALE = float(os.environ.get("RATELIMIT_BUCKET_SCALE", 1))
+    JOBS_STORAGE_URL = os.environ.get("REDIS_URL")
+    JOBS_RESULT_TTL = 3600
+    JOBS_LOCAL_WORKERS = 2
+    JOBS_HEARTBEAT_INTERVAL = 10
+    JOBS_STALE_AFTER = 60
+    JOBS_MAX_ATTEMPTS = 3
 
     @staticmethod
     def init_app(app) -> None:  # noqa
@@ -76,10 +127,12 @@ class DevelopmentConfig(Config):
         SQLALCHEMY_TRACK_MODIFICATIONS (bool): SQLAlchemy track modifications set to False.
         SQLALCHEMY_ECHO (bool): SQLAlchemy echo mode set to False.
         SQLALCHEMY_ENGINE_OPTIONS (dict): Additional options for configuring SQLAlchemy Engine.
+        ORG_ANALYTICS_VERIFY (bool): Set to True to catch drift of the incremental analytics early.
     """
 
     ENV = "development"
     DEBUG = True
+    ORG_ANALYTICS_VERIFY = True
 
     dev_database_user = os.environ.get("DEV_DATABASE_USER")
     dev_database_password = os.environ.get("DEV_DATABASE_PASSWORD")
@@ -121,6 +174,9 @@ class TestingConfig(Config):
         SQLALCHEMY_DATABASE_URI (str): The SQLAlchemy database URI for the testing database.
         PRESERVE_CONTEXT_ON_EXCEPTION (bool): Set to False.
         SQLALCHEMY_TRACK_MODIFICATIONS (bool): Set to False.
+        ORG_CHANGEFEED_ENABLED (bool): Set to False, tests do not run the listener thread.
+        RATELIMIT_STORAGE_URL (str): Set to None, tests use per-worker buckets.
+        JOBS_STORAGE_URL (str): Set to None, tests run jobs in-process.
     """
 
     ENV = "testing"
@@ -143,6 +199,9 @@ class TestingConfig(Config):
     PRESERVE_CONTEXT_ON_EXCEPTION = False
     SQLALCHEMY_TRACK_MODIFICATIONS = True
     SQLALCHEMY_ECHO = True
+    ORG_CHANGEFEED_ENABLED = False
+    RATELIMIT_STORAGE_URL = None
+    JOBS_STORAGE_URL = None
 
 
 class ProductionConfig(Config):
@@ -0,0 +1,121 @@
+"""
+Module containing a DataLoader for coalescing lookups.
+
+Code that needs a single record asks the loader for it and receives a `Deferred`
+placeholder. Nothing is queried until the first placeholder is read; at that point all
+keys requested so far are fetched with one batch call, each distinct key once, and
+cached for the rest of the loader's lifetime (usually one request).
+
+Usage:
+deferred = [loader.load(key) for key in keys]  # no query yet
+values = [item.get() for item in deferred]  # one batch query for all keys
+"""
+
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Mapping, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class Deferred(Generic[K, V]):
+    """Placeholder for a value that is fetched with the next batch of its loader."""
+
+    __slots__ = ("_loader", "key")
+
+    def __init__(self, loader: "DataLoader[K, V]", key: K) -> None:
+        self._loader = loader
+        self.key = key
+
+    def get(self) -> Optional[V]:
+        """
+        Return the value, dispatching the pending batch first if needed.
+
+        Returns:
+            Optional[V]: The value, or None if the key does not exist.
+        """
+        return self._loader.get(self.key)
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Batches and deduplicates lookups by key.
+
+    Args:
+        batch_load (Callable[[List[K]], Mapping[K, V]]): Fetches many keys at once; keys
+            missing from the returned mapping resolve to None.
+        max_batch_size (Optional[int]): Split batches larger than this.
+    """
+
+    def __init__(self, batch_load: Callable[[List[K]], Mapping[K, V]], max_batch_size: Optional[int] = None) -> None:
+        self._batch_load = batch_load
+        self._max_batch_size = max_batch_size
+        self._cache: Dict[K, Optional[V]] = {}
+        self._queue: Dict[K, None] = {}
+
+    def load(self, key: K) -> Deferred[K, V]:
+        """
+        Request a key.
+
+        Args:
+            key (K): The key.
+
+        Returns:
+            Deferred[K, V]: A placeholder for the value.
+        """
+        if key not in self._cache:
+            self._queue[key] = None
+        return Deferred(self, key)
+
+    def load_many(self, keys: Iterable[K]) -> List[Deferred[K, V]]:
+        """
+        Request many keys.
+
+        Args:
+            keys (Iterable[K]): The keys; duplicates are fetched once.
+
+        Returns:
+            List[Deferred[K, V]]: A placeholder per key, in order.
+        """
+        return [self.load(key) for key in keys]
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Return the value of a key, fetching it with all pending keys if needed.
+
+        Args:
+            key (K): The key.
+
+        Returns:
+            Optional[V]: The value, or None if the key does not exist.
+        """
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            self._queue[key] = None
+            self.dispatch()
+            value = self._cache[key]
+        return value
+
+    def prime(self, key: K, value: Optional[V]) -> None:
+        """
+        Put a known value into the cache.
+
+        Args:
+            key (K): The key.
+            value (Optional[V]): The value.
+        """
+        self._cache[key] = value
+        self._queue.pop(key, None)
+
+    def dispatch(self) -> None:
+        """Fetch all pending keys."""
+        while self._queue:
+            keys = list(self._queue)
+            if self._max_batch_size is not None:
+                keys = keys[: self._max_batch_size]
+            for key in keys:
+                del self._queue[key]
+            found = self._batch_load(keys)
+            for key in keys:
+                self._cache[key] = found.get(key)
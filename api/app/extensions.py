@@ -1,13 +1,15 @@
 """
 Module containing Flask extensions.
 
-This module initializes and provides instances of Flask extensions like SQLAlchemy and Bcrypt.
+This module initializes and provides instances of Flask extensions like SQLAlchemy, Bcrypt and Compress.
 """
 
 from flask_bcrypt import Bcrypt
+from flask_compress import Compress
 from flask_sqlalchemy import SQLAlchemy
 
 from app.database import Base
 
 db = SQLAlchemy(model_class=Base)
 bcrypt = Bcrypt()
+compress = Compress()
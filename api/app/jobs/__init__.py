@@ -0,0 +1,4 @@
+"""Package for background jobs: queue, worker and status routes."""
+# noqa: WPS412
+from app.jobs.queue import Job, JobContext, jobs  # noqa: F401
+from app.jobs.routes import jobs_bp  # noqa: F401
@@ -0,0 +1,494 @@
+"""
+Module containing the background job queue.
+
+Long-running work (imports, exports, layout computation) is enqueued by the web workers
+and executed by separate job workers (see `worker.py`), so it is not bound by the
+gunicorn request timeout and never occupies request-serving threads. Clients poll the
+job for its status and progress and fetch the result once it is finished; results
+expire after `JOBS_RESULT_TTL` seconds.
+
+Jobs are kept in Redis when `JOBS_STORAGE_URL` is set. Without it the queue falls back
+to an in-memory store whose jobs run on threads of the web worker itself, which is
+meant for development and tests.
+
+Usage:
+@jobs.task("org.layout")
+def compute_layout(context: JobContext, root: str = None) -> dict:
+    ...
+    context.progress(done, total)
+    return result
+"""
+
+import inspect
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, current_app
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+KEY_PREFIX = "jobs:"
+QUEUE_KEY = KEY_PREFIX + "queue"
+PROCESSING_KEY = KEY_PREFIX + "processing"
+
+# Pending jobs expire as well, so a queue nobody works on cannot grow without bounds.
+PENDING_TTL = 7 * 24 * 3600
+
+
+class UnknownTask(LookupError):
+    """Raised when a job names a task that is not registered."""
+
+
+class InvalidParams(ValueError):
+    """Raised when job parameters do not match the signature of the task."""
+
+
+@dataclass
+class Job:
+    """
+    State of a background job.
+
+    Attributes:
+        id (str): The job id.
+        task (str): Name of the registered task.
+        params (dict): Keyword arguments of the task.
+        status (str): One of queued, running, finished and failed.
+        progress (int): Units of work done so far.
+        total (Optional[int]): Units of work in total, if known.
+        message (Optional[str]): Latest progress message.
+        error (Optional[str]): Why the job failed.
+        attempts (int): How many times the job was started.
+        created_at (float): Unix time of enqueueing.
+        started_at (Optional[float]): Unix time the latest attempt started.
+        finished_at (Optional[float]): Unix time the job finished or failed.
+        heartbeat_at (Optional[float]): Unix time the running job last showed signs of life.
+        owner (Optional[str]): Public id of the user who started the job, None if anonymous.
+    """
+
+    task: str
+    params: dict = field(default_factory=dict)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    progress: int = 0
+    total: Optional[int] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    heartbeat_at: Optional[float] = None
+    owner: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the job for status responses.
+
+        Returns:
+            dict: The job without its parameters.
+        """
+        data = asdict(self)
+        del data["params"]
+        return data
+
+
+class Task(NamedTuple):
+    """
+    A registered task.
+
+    Attributes:
+        func (Callable): The task function.
+        mimetype (Optional[str]): Media type of the result; JSON if None.
+        roles (Optional[Tuple[Any, ...]]): User roles allowed to start the task; anyone if None.
+        validate (Optional[Callable[..., None]]): Checks the job parameters when the job is
+            enqueued, raising ValueError for invalid ones.
+    """
+
+    func: Callable
+    mimetype: Optional[str] = None
+    roles: Optional[Tuple[Any, ...]] = None
+    validate: Optional[Callable[..., None]] = None
+
+
+class JobContext:
+    """
+    Handle passed to a running task for reporting progress.
+
+    Progress is written to the store at most every `interval` seconds and whenever the
+    total is reached, so tasks may report after every chunk without flooding the store.
+    """
+
+    def __init__(self, queue: "JobQueue", job: Job, interval: float = 0.5) -> None:
+        self.job = job
+        self._queue = queue
+        self._interval = interval
+        self._reported_at = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        """
+        Report progress.
+
+        Args:
+            done (int): Units of work done so far.
+            total (Optional[int]): Units of work in total, if known.
+            message (Optional[str]): A short description of the current step.
+        """
+        self.job.progress = done
+        self.job.total = total if total is not None else self.job.total
+        self.job.message = message if message is not None else self.job.message
+        now = time.monotonic()
+        if now - self._reported_at >= self._interval or done == self.job.total:
+            self._reported_at = now
+            self._queue.store.update(
+                self.job.id,
+                progress=self.job.progress,
+                total=self.job.total,
+                message=self.job.message,
+                heartbeat_at=time.time(),
+            )
+
+
+class MemoryStore:
+    """In-process job store; jobs run on a thread pool of the enqueueing process."""
+
+    def __init__(self, queue: "JobQueue", app: Flask, workers: int) -> None:
+        self._queue = queue
+        self._app = app
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._results: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def save(self, job: Job, ttl: int) -> None:
+        """Store a job."""
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+            self._expires[job.id] = time.monotonic() + ttl
+
+    def update(self, job_id: str, ttl: Optional[int] = None, **changes: Any) -> None:
+        """Change fields of a stored job and optionally its expiry."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for name, value in changes.items():
+                setattr(job, name, value)
+            if ttl is not None:
+                self._expires[job_id] = time.monotonic() + ttl
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a copy of a job, or None if it is unknown or expired."""
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            return Job(**asdict(job)) if job is not None else None
+
+    def set_result(self, job_id: str, result: Any, ttl: int) -> None:
+        """Store the result of a job."""
+        with self._lock:
+            self._results[job_id] = result
+            self._expires[job_id] = time.monotonic() + ttl
+
+    def get_result(self, job_id: str) -> Any:
+        """Return the result of a job, or None."""
+        with self._lock:
+            self._purge()
+            return self._results.get(job_id)
+
+    def push(self, job: Job) -> None:
+        """Run the job on the local thread pool."""
+
+        def run() -> None:
+            with self._app.app_context():
+                self._queue.execute(job.id)
+
+        self._executor.submit(run)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, expires in self._expires.items() if expires <= now]:
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+            del self._expires[job_id]
+
+
+class RedisStore:
+    """
+    Job store in Redis.
+
+    Every job is a hash `jobs:<id>`, its result the key `jobs:<id>:result`. Job ids wait
+    in the list `jobs:queue`; a worker atomically moves the id it takes to
+    `jobs:processing`, so a job whose worker dies is not lost but requeued once its
+    heartbeat is stale.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.client = redis.Redis.from_url(url, decode_responses=False)
+
+    def save(self, job: Job, ttl: int) -> None:
+        """Store a job."""
+        key = KEY_PREFIX + job.id
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, mapping=self._encode(asdict(job)))
+        pipeline.expire(key, ttl)
+        pipeline.execute()
+
+    def update(self, job_id: str, ttl: Optional[int] = None, **changes: Any) -> None:
+        """Change fields of a stored job and optionally its expiry."""
+        key = KEY_PREFIX + job_id
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, mapping=self._encode(changes))
+        if ttl is not None:
+            pipeline.expire(key, ttl)
+        pipeline.execute()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job, or None if it is unknown or expired."""
+        data = self.client.hgetall(KEY_PREFIX + job_id)
+        if not data:
+            return None
+        names = {item.name for item in fields(Job)}
+        return Job(
+            **{key.decode(): current_app.json.loads(value) for key, value in data.items() if key.decode() in names}
+        )
+
+    def set_result(self, job_id: str, result: Any, ttl: int) -> None:
+        """Store the result of a job."""
+        self.client.set(f"{KEY_PREFIX}{job_id}:result", current_app.json.dumps(result), ex=ttl)
+
+    def get_result(self, job_id: str) -> Any:
+        """Return the result of a job, or None."""
+        value = self.client.get(f"{KEY_PREFIX}{job_id}:result")
+        return current_app.json.loads(value) if value is not None else None
+
+    def push(self, job: Job) -> None:
+        """Append a job to the queue."""
+        self.client.lpush(QUEUE_KEY, job.id)
+
+    def reserve(self, timeout: int) -> Optional[str]:
+        """
+        Take the next job id off the queue.
+
+        Args:
+            timeout (int): Seconds to block while the queue is empty.
+
+        Returns:
+            Optional[str]: The job id, or None after the timeout.
+        """
+        job_id = self.client.blmove(QUEUE_KEY, PROCESSING_KEY, timeout, "RIGHT", "LEFT")
+        return job_id.decode() if job_id is not None else None
+
+    def acknowledge(self, job_id: str) -> None:
+        """Remove a job that is done from the processing list."""
+        self.client.lrem(PROCESSING_KEY, 1, job_id)
+
+    def processing(self) -> List[str]:
+        """Return the ids of the jobs taken by workers."""
+        return [job_id.decode() for job_id in self.client.lrange(PROCESSING_KEY, 0, -1)]
+
+    def requeue(self, job_id: str) -> bool:
+        """
+        Move a job from the processing list back to the queue.
+
+        Returns:
+            bool: False if another worker requeued or finished it first.
+        """
+        pipeline = self.client.pipeline()
+        pipeline.lrem(PROCESSING_KEY, 1, job_id)
+        pipeline.rpush(QUEUE_KEY, job_id)
+        removed, _ = pipeline.execute()
+        if not removed:
+            self.client.lrem(QUEUE_KEY, -1, job_id)
+        return bool(removed)
+
+    @staticmethod
+    def _encode(data: Dict[str, Any]) -> Dict[str, bytes]:
+        return {key: current_app.json.dumps(value) for key, value in data.items()}
+
+
+class JobQueue:
+    """
+    Flask extension holding the task registry and the job store.
+
+    Attributes:
+        store (Union[MemoryStore, RedisStore]): Where jobs are kept.
+        tasks (Dict[str, Task]): The registered tasks by name.
+    """
+
+    def __init__(self) -> None:
+        self.store = None
+        self.tasks: Dict[str, Task] = {}
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Choose the job store for the application.
+
+        Args:
+            app (Flask): The Flask application instance.
+        """
+        url = app.config.get("JOBS_STORAGE_URL")
+        if url and redis is not None:
+            self.store = RedisStore(url)
+        else:
+            if url:
+                logger.warning("The redis package is not installed; jobs run in the web workers")
+            self.store = MemoryStore(self, app, app.config.get("JOBS_LOCAL_WORKERS", 2))
+
+    def task(
+        self,
+        name: str,
+        mimetype: Optional[str] = None,
+        roles: Optional[Tuple[Any, ...]] = None,
+        validate: Optional[Callable[..., None]] = None,
+    ) -> Callable[[Callable], Callable]:
+        """
+        Register a task.
+
+        The task is called with a `JobContext` and the job parameters as keyword arguments,
+        inside an application context. Its return value is the job result.
+
+        Args:
+            name (str): The name jobs refer to.
+            mimetype (Optional[str]): Media type of a text result; results are JSON by default.
+            roles (Optional[Tuple[Any, ...]]): User roles allowed to start the task through the
+                API; anyone if None.
+            validate (Optional[Callable[..., None]]): Called with the job parameters as keyword
+                arguments when a job is enqueued; raises ValueError for invalid ones.
+
+        Returns:
+            Callable[[Callable], Callable]: The decorator.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            self.tasks[name] = Task(func, mimetype, roles, validate)
+            return func
+
+        return decorator
+
+    def enqueue(self, task: str, params: Optional[Dict[str, Any]] = None, owner: Optional[str] = None) -> Job:
+        """
+        Create a job and queue it.
+
+        The parameters are checked against the task's signature and its validator, so a job
+        that is bound to fail is rejected here rather than in the worker.
+
+        Args:
+            task (str): Name of a registered task.
+            params (Optional[Dict[str, Any]]): Keyword arguments of the task; must be JSON serializable.
+            owner (Optional[str]): Public id of the user starting the job.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            UnknownTask: If no task of that name is registered.
+            InvalidParams: If the parameters do not match the task.
+        """
+        spec = self.tasks.get(task)
+        if spec is None:
+            raise UnknownTask(task)
+        params = dict(params or {})
+        try:
+            inspect.signature(spec.func).bind(None, **params)
+            if spec.validate is not None:
+                spec.validate(**params)
+        except (TypeError, ValueError) as error:
+            raise InvalidParams(str(error)) from None
+        job = Job(task, params, owner=owner)
+        self.store.save(job, PENDING_TTL)
+        self.store.push(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[Job]: The job, or None if it is unknown or has expired.
+        """
+        return self.store.get(job_id)
+
+    def result(self, job_id: str) -> Any:
+        """
+        Return the result of a finished job.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Any: The result, or None if there is none (yet).
+        """
+        return self.store.get_result(job_id)
+
+    def execute(self, job_id: str) -> Optional[Job]:
+        """
+        Run a job and record its outcome. Must be called inside an application context.
+
+        A result that cannot be stored fails the job like an error of the task does.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[Job]: The job in its final state, or None if it has expired meanwhile.
+
+        Raises:
+            Exception: Errors of the store while the job's state is written; the job's
+                final state is then unknown and it must not be acknowledged.
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        ttl = current_app.config.get("JOBS_RESULT_TTL", 3600)
+        job.status, job.attempts, job.started_at = RUNNING, job.attempts + 1, time.time()
+        self.store.update(
+            job.id, status=job.status, attempts=job.attempts, started_at=job.started_at, heartbeat_at=job.started_at
+        )
+        try:
+            task = self.tasks.get(job.task)
+            if task is None:
+                raise UnknownTask(job.task)
+            result = task.func(JobContext(self, job), **job.params)
+            self.store.set_result(job.id, result, ttl)
+        except Exception as error:
+            logger.exception("Job %s (%s) failed", job.id, job.task)
+            job.status, job.error = FAILED, f"{type(error).__name__}: {error}"
+        else:
+            job.status = FINISHED
+            if job.total is not None:
+                job.progress = job.total
+        job.finished_at = time.time()
+        self.store.update(
+            job.id,
+            ttl=ttl,
+            status=job.status,
+            error=job.error,
+            progress=job.progress,
+            total=job.total,
+            message=job.message,
+            finished_at=job.finished_at,
+        )
+        return job
+
+
+jobs = JobQueue()
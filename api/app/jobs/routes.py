@@ -0,0 +1,98 @@
+"""Routes of the background jobs API."""
+
+from flask import Blueprint, Response, abort, jsonify, request, url_for
+
+from app.jobs.queue import FINISHED, InvalidParams, Job, jobs
+from app.ratelimit import Limit, limiter
+from app.users.auth import check_role, current_user
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+@jobs_bp.route("/<task>", methods=["POST"])
+@limiter.limit(per_client=Limit(rate=0.5, burst=10))
+def enqueue(task: str):
+    """
+    Start a background job.
+
+    Args:
+        task (str): Name of the task, e.g. `org.export`.
+
+    JSON Args:
+        The keyword arguments of the task.
+    """
+    spec = jobs.tasks.get(task)
+    if spec is None:
+        abort(404, description=f"Unknown task {task!r}.")
+    user = check_role(*spec.roles) if spec.roles is not None else current_user()
+    params = request.get_json(silent=True) or {}
+    if not isinstance(params, dict):
+        abort(400, description="The job parameters must be a JSON object.")
+    try:
+        job = jobs.enqueue(task, params, owner=str(user.public_id) if user is not None else None)
+    except InvalidParams as error:
+        abort(400, description=f"Invalid parameters for {task}: {error}.")
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers["Location"] = url_for("jobs.status", job_id=job.id)
+    return response
+
+
+def readable_job(job_id: str) -> Job:
+    """
+    Look up a job the caller may read, aborting otherwise.
+
+    A job is readable by the user who started it and by users allowed to start its task.
+    Jobs started without a token, of tasks open to everyone, are readable with their id.
+
+    Args:
+        job_id (str): The job id.
+
+    Returns:
+        Job: The job.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404, description="Unknown or expired job.")
+    user = current_user()
+    if job.owner is not None and user is not None and str(user.public_id) == job.owner:
+        return job
+    task = jobs.tasks.get(job.task)
+    if task is not None and task.roles is not None:
+        check_role(*task.roles)
+    elif job.owner is not None:
+        abort(404, description="Unknown or expired job.")
+    return job
+
+
+@jobs_bp.route("/<job_id>", methods=["GET"])
+def status(job_id: str):
+    """
+    Return the status and progress of a job.
+
+    Args:
+        job_id (str): The job id.
+    """
+    job = readable_job(job_id)
+    data = job.to_dict()
+    if job.status == FINISHED:
+        data["result"] = url_for("jobs.result", job_id=job.id)
+    return jsonify(data)
+
+
+@jobs_bp.route("/<job_id>/result", methods=["GET"])
+def result(job_id: str):
+    """
+    Return the result of a finished job.
+
+    Args:
+        job_id (str): The job id.
+    """
+    job = readable_job(job_id)
+    if job.status != FINISHED:
+        abort(409, description=f"The job is {job.status}.")
+    value = jobs.result(job_id)
+    task = jobs.tasks.get(job.task)
+    if task is not None and task.mimetype is not None:
+        return Response(value, mimetype=task.mimetype)
+    return jsonify(value)
@@ -0,0 +1,127 @@
+"""
+Module containing the job worker.
+
+A worker process runs a few threads that take jobs off the Redis queue and execute them,
+each inside its own application context. While a job runs, a heartbeat thread keeps its
+`heartbeat_at` fresh; jobs of a worker that died are found by their stale heartbeat and
+requeued, up to `JOBS_MAX_ATTEMPTS` starts, after which they are marked as failed.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict
+
+from flask import Flask
+
+from app.jobs.queue import FAILED, JobQueue, RedisStore
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Execute queued jobs until stopped.
+
+    Args:
+        app (Flask): The application providing configuration, database and tasks.
+        queue (JobQueue): The job queue; it must use the Redis store.
+        concurrency (int): Number of jobs run at the same time.
+    """
+
+    def __init__(self, app: Flask, queue: JobQueue, concurrency: int = 2) -> None:
+        if not isinstance(queue.store, RedisStore):
+            raise RuntimeError("Job workers need JOBS_STORAGE_URL; without it jobs run in the web workers.")
+        self.app = app
+        self.queue = queue
+        self.concurrency = concurrency
+        self.stopping = threading.Event()
+        self._running: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def run(self) -> None:
+        """Run until `stop` is called, e.g. from a signal handler."""
+        threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            for index in range(self.concurrency)
+        ]
+        threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in threads:
+            thread.start()
+        logger.info("Job worker started with %d threads", self.concurrency)
+        for thread in threads:
+            thread.join()
+        logger.info("Job worker stopped")
+
+    def stop(self) -> None:
+        """Stop taking new jobs; running jobs are finished first."""
+        self.stopping.set()
+
+    def _work(self) -> None:
+        store = self.queue.store
+        while not self.stopping.is_set():
+            try:
+                job_id = store.reserve(timeout=1)
+            except Exception:
+                logger.exception("Could not take a job off the queue")
+                self.stopping.wait(5)
+                continue
+            if job_id is None:
+                continue
+            with self._lock:
+                self._running[job_id] = time.time()
+            try:
+                with self.app.app_context():
+                    job = self.queue.execute(job_id)
+                # Only a job whose final state is stored may leave the processing list.
+                store.acknowledge(job_id)
+            except Exception:
+                # The job stays in the processing list and is requeued once its heartbeat is stale.
+                logger.exception("Job %s could not be recorded", job_id)
+                continue
+            finally:
+                with self._lock:
+                    del self._running[job_id]
+            if job is not None:
+                logger.info("Job %s (%s) %s", job.id, job.task, job.status)
+
+    def _heartbeat(self) -> None:
+        config = self.app.config
+        interval = config.get("JOBS_HEARTBEAT_INTERVAL", 10)
+        while not self.stopping.wait(interval):
+            with self._lock:
+                running = list(self._running)
+            try:
+                with self.app.app_context():
+                    for job_id in running:
+                        self.queue.store.update(job_id, heartbeat_at=time.time())
+                    self.requeue_stale(config.get("JOBS_STALE_AFTER", 60), config.get("JOBS_MAX_ATTEMPTS", 3))
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def requeue_stale(self, stale_after: float, max_attempts: int) -> None:
+        """
+        Requeue the jobs of workers that stopped sending heartbeats.
+
+        Must be called inside an application context.
+
+        Args:
+            stale_after (float): Seconds without heartbeat after which a job is considered abandoned.
+            max_attempts (int): Jobs started this many times are marked as failed instead.
+        """
+        store = self.queue.store
+        now = time.time()
+        for job_id in store.processing():
+            job = store.get(job_id)
+            if job is None:
+                store.acknowledge(job_id)
+                continue
+            last_seen = job.heartbeat_at or job.started_at or job.created_at
+            if now - last_seen < stale_after:
+                continue
+            if job.attempts >= max_attempts:
+                logger.warning("Job %s (%s) abandoned %d times, giving up", job.id, job.task, job.attempts)
+                store.update(job_id, status=FAILED, error="Worker lost", finished_at=now)
+                store.acknowledge(job_id)
+            elif store.requeue(job_id):
+                logger.warning("Job %s (%s) abandoned by its worker, requeued", job.id, job.task)
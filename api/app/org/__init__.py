@@ -0,0 +1,10 @@
+"""Package for org-level functionality: snapshot, change feed, history, analytics, chains, chart routes and jobs."""
+# noqa: WPS412
+from app.org.analytics import org_analytics  # noqa: F401
+from app.org.chains import management_chains  # noqa: F401
+from app.org.changefeed import changefeed  # noqa: F401
+from app.org.history import load_snapshot_as_of  # noqa: F401
+from app.org.jobs import export_org, import_reporting_lines, layout_org  # noqa: F401
+from app.org.models import OrgSnapshotRecord, OrgState, UserVersion  # noqa: F401
+from app.org.routes import org_bp  # noqa: F401
+from app.org.snapshot import OrgNode, OrgSnapshot, get_snapshot  # noqa: F401
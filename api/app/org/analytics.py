@@ -0,0 +1,367 @@
+"""
+Module containing the org analytics: headcount, span of control and depth.
+
+`OrgAnalytics` keeps the aggregates of every worker up to date incrementally: a hire, move
+or exit only updates the headcount of the ancestors of the changed node (and, for moves,
+the depth of the moved subtree). `compute_aggregates` recomputes everything from a parent
+array with NumPy; it seeds the incremental state and verifies it.
+"""
+
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+
+import numpy as np
+from flask import current_app
+
+from app.org.changefeed import changefeed
+from app.org.snapshot import OrgSnapshot, affected_nodes, changed_nodes
+
+logger = logging.getLogger(__name__)
+
+
+class Aggregates(NamedTuple):
+    """Per-node aggregates of a full recompute, aligned with `ids`."""
+
+    ids: np.ndarray
+    parent: np.ndarray
+    depth: np.ndarray
+    headcount: np.ndarray
+    direct_reports: np.ndarray
+
+
+def compute_aggregates(parent: np.ndarray) -> Aggregates:
+    """
+    Compute depth, subtree headcount and direct reports from a parent array.
+
+    Depths are found by pointer jumping in O(log depth) vectorized steps; headcounts are
+    then summed bottom-up one level at a time. Nodes on or below a reporting cycle never
+    reach a root; they are treated as roots.
+
+    Args:
+        parent (np.ndarray): Index of each node's parent, -1 for roots.
+
+    Returns:
+        Aggregates: The aggregates, with `ids` set to the node indices.
+    """
+    parent = parent.astype(np.int64, copy=True)
+    size = len(parent)
+    depth = (parent >= 0).astype(np.int64)
+    jump = parent.copy()
+    for _ in range(max(size, 1).bit_length() + 1):
+        active = np.flatnonzero(jump >= 0)
+        if not len(active):
+            break
+        targets = jump[active]
+        depth[active] += depth[targets]
+        jump[active] = jump[targets]
+
+    cyclic = jump >= 0
+    if cyclic.any():
+        parent[cyclic] = -1
+        return compute_aggregates(parent)
+
+    headcount = np.ones(size, dtype=np.int64)
+    order = np.argsort(depth, kind="stable")
+    levels = np.split(order, np.flatnonzero(np.diff(depth[order])) + 1)
+    for level in reversed(levels[1:] if size else []):
+        np.add.at(headcount, parent[level], headcount[level])
+
+    direct_reports = np.bincount(parent[parent >= 0], minlength=size)
+    return Aggregates(np.arange(size), parent, depth, headcount, direct_reports)
+
+
+def recompute(snapshot: OrgSnapshot) -> Aggregates:
+    """
+    Recompute all aggregates of a snapshot.
+
+    Args:
+        snapshot (OrgSnapshot): The snapshot.
+
+    Returns:
+        Aggregates: The aggregates, with `ids` holding internal user ids.
+    """
+    ids = np.fromiter(snapshot.nodes, dtype=np.int64, count=len(snapshot))
+    index = {node_id: position for position, node_id in enumerate(snapshot.nodes)}
+    parent = np.fromiter(
+        (index.get(node.manager_id, -1) for node in snapshot.nodes.values()),
+        dtype=np.int64,
+        count=len(snapshot),
+    )
+    aggregates = compute_aggregates(parent)
+    return aggregates._replace(ids=ids)
+
+
+class OrgAnalytics:
+    """
+    Incrementally maintained org aggregates of one worker.
+
+    Attributes:
+        version (Optional[int]): The org version the aggregates describe.
+        snapshot (Optional[OrgSnapshot]): The snapshot the aggregates describe.
+        parent (Dict[int, Optional[int]]): Manager of every node, None for roots.
+        children (Dict[int, Set[int]]): Direct reports of every node.
+        headcount (Dict[int, int]): Size of every node's subtree, including the node.
+        depth (Dict[int, int]): Distance of every node from its root.
+        depth_distribution (Counter): Number of nodes per depth.
+        span_distribution (Counter): Number of managers per number of direct reports.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.version: Optional[int] = None
+        self.snapshot: Optional[OrgSnapshot] = None
+        self.parent: Dict[int, Optional[int]] = {}
+        self.children: Dict[int, Set[int]] = {}
+        self.headcount: Dict[int, int] = {}
+        self.depth: Dict[int, int] = {}
+        self.depth_distribution: Counter = Counter()
+        self.span_distribution: Counter = Counter()
+        self._summary: Optional[dict] = None
+
+    def rebuild(self, snapshot: OrgSnapshot) -> None:
+        """
+        Replace the aggregates with a full recompute of a snapshot.
+
+        Args:
+            snapshot (OrgSnapshot): The snapshot.
+        """
+        aggregates = recompute(snapshot)
+        ids = aggregates.ids.tolist()
+        parents = [ids[position] if position >= 0 else None for position in aggregates.parent.tolist()]
+        with self._lock:
+            self.parent = dict(zip(ids, parents))
+            self.children = {node_id: set() for node_id in ids}
+            for node_id, parent_id in self.parent.items():
+                if parent_id is not None:
+                    self.children[parent_id].add(node_id)
+            self.headcount = dict(zip(ids, aggregates.headcount.tolist()))
+            self.depth = dict(zip(ids, aggregates.depth.tolist()))
+            self.depth_distribution = Counter(self.depth.values())
+            self.span_distribution = Counter(count for count in aggregates.direct_reports.tolist() if count)
+            self.version, self.snapshot = snapshot.version, snapshot
+            self._summary = None
+
+    def apply(self, old: Optional[OrgSnapshot], new: OrgSnapshot, changed_ids: Optional[Set[int]]) -> None:
+        """
+        Bring the aggregates from `old` to `new`, incrementally where possible.
+
+        Args:
+            old (Optional[OrgSnapshot]): The previous snapshot, None if unknown.
+            new (OrgSnapshot): The current snapshot.
+            changed_ids (Optional[Set[int]]): Internal ids of the changed users, None if unknown.
+        """
+        with self._lock:
+            if self.version is not None and self.version >= new.version:
+                # A request pinned the aggregates to this or a newer version already.
+                return
+            if old is None or changed_ids is None or self.version != old.version:
+                self.rebuild(new)
+                return
+
+            affected = affected_nodes(old, new, changed_ids)
+            present = [node_id for node_id in affected if node_id in new.nodes]
+
+            # Detach everything first, so attaching never has to pass through a cycle.
+            for node_id in present:
+                if node_id not in self.parent:
+                    self._add(node_id)
+                self._move(node_id, None)
+            for node_id in present:
+                manager_id = new.nodes[node_id].manager_id
+                self._move(node_id, manager_id if manager_id in new.nodes else None)
+            for node_id in affected:
+                if node_id not in new.nodes and node_id in self.parent:
+                    self._remove(node_id)
+
+            self.version, self.snapshot = new.version, new
+            self._summary = None
+
+    def verify(self, snapshot: OrgSnapshot) -> List[int]:
+        """
+        Compare the incremental aggregates with a full recompute.
+
+        Args:
+            snapshot (OrgSnapshot): The snapshot the aggregates should describe.
+
+        Returns:
+            List[int]: Internal ids of the nodes whose aggregates differ.
+        """
+        aggregates = recompute(snapshot)
+        with self._lock:
+            mismatches = [
+                node_id
+                for node_id, headcount, depth, direct_reports in zip(
+                    aggregates.ids.tolist(),
+                    aggregates.headcount.tolist(),
+                    aggregates.depth.tolist(),
+                    aggregates.direct_reports.tolist(),
+                )
+                if (self.headcount.get(node_id), self.depth.get(node_id)) != (headcount, depth)
+                or len(self.children.get(node_id, ())) != direct_reports
+            ]
+            if len(self.parent) != len(snapshot):
+                mismatches.extend(set(self.parent) - set(snapshot.nodes))
+        return mismatches
+
+    @contextmanager
+    def pinned(self, snapshot: OrgSnapshot) -> Iterator["OrgAnalytics"]:
+        """
+        Hold the aggregates at the version of a snapshot, or a newer one.
+
+        Change-feed updates wait until the block ends, so several reads inside it describe
+        the same org. A snapshot one version ahead is applied incrementally, and only a
+        larger gap rebuilds. An older snapshot does not rebuild the aggregates backwards;
+        the caller uses their `snapshot` instead.
+
+        Args:
+            snapshot (OrgSnapshot): The newest snapshot known to the caller.
+
+        Yields:
+            OrgAnalytics: The aggregates.
+        """
+        with self._lock:
+            current = self.snapshot
+            if current is None or snapshot.version > current.version + 1:
+                self.rebuild(snapshot)
+            elif snapshot.version == current.version + 1:
+                self.apply(current, snapshot, changed_nodes(current, snapshot))
+            yield self
+
+    def summary(self, snapshot: OrgSnapshot) -> dict:
+        """
+        Return the org-wide aggregates for a snapshot, cached per org version.
+
+        Args:
+            snapshot (OrgSnapshot): The snapshot the aggregates must describe at least.
+
+        Returns:
+            dict: Headcount, manager count, average span, max depth and the distributions.
+        """
+        with self.pinned(snapshot):
+            if self._summary is None:
+                managers = sum(self.span_distribution.values())
+                reports = sum(span * count for span, count in self.span_distribution.items())
+                self._summary = {
+                    "version": self.version,
+                    "headcount": len(self.parent),
+                    "managers": managers,
+                    "average_span": reports / managers if managers else 0.0,
+                    "max_depth": max(self.depth_distribution, default=0),
+                    "depth_distribution": dict(sorted(self.depth_distribution.items())),
+                    "span_of_control": dict(sorted(self.span_distribution.items())),
+                }
+            return self._summary
+
+    def node(self, node_id: int) -> dict:
+        """
+        Return the aggregates of a single node.
+
+        Args:
+            node_id (int): Internal id of the node.
+
+        Returns:
+            dict: The subtree headcount, number of direct reports and depth.
+        """
+        with self._lock:
+            return {
+                "headcount": self.headcount[node_id],
+                "direct_reports": len(self.children[node_id]),
+                "depth": self.depth[node_id],
+            }
+
+    def _add(self, node_id: int) -> None:
+        self.parent[node_id] = None
+        self.children[node_id] = set()
+        self.headcount[node_id] = 1
+        self.depth[node_id] = 0
+        self.depth_distribution[0] += 1
+
+    def _remove(self, node_id: int) -> None:
+        self._move(node_id, None)
+        for child_id in list(self.children[node_id]):
+            self._move(child_id, None)
+        self._count(self.depth_distribution, self.depth.pop(node_id), -1)
+        del self.parent[node_id], self.children[node_id], self.headcount[node_id]
+
+    def _move(self, node_id: int, new_parent: Optional[int]) -> None:
+        old_parent = self.parent[node_id]
+        if new_parent is not None and (new_parent not in self.parent or self._is_descendant(new_parent, node_id)):
+            new_parent = None
+        if old_parent == new_parent:
+            return
+
+        size = self.headcount[node_id]
+        if old_parent is not None:
+            self._set_child(old_parent, node_id, present=False)
+            for ancestor in self._ancestors(old_parent):
+                self.headcount[ancestor] -= size
+        if new_parent is not None:
+            self._set_child(new_parent, node_id, present=True)
+            for ancestor in self._ancestors(new_parent):
+                self.headcount[ancestor] += size
+        self.parent[node_id] = new_parent
+
+        shift = (0 if new_parent is None else self.depth[new_parent] + 1) - self.depth[node_id]
+        if shift:
+            for descendant in self._subtree(node_id):
+                self._count(self.depth_distribution, self.depth[descendant], -1)
+                self.depth[descendant] += shift
+                self._count(self.depth_distribution, self.depth[descendant], 1)
+
+    def _set_child(self, parent_id: int, child_id: int, present: bool) -> None:
+        children = self.children[parent_id]
+        if children:
+            self._count(self.span_distribution, len(children), -1)
+        if present:
+            children.add(child_id)
+        else:
+            children.discard(child_id)
+        if children:
+            self._count(self.span_distribution, len(children), 1)
+
+    def _ancestors(self, node_id: Optional[int]) -> Iterator[int]:
+        while node_id is not None:
+            yield node_id
+            node_id = self.parent[node_id]
+
+    def _is_descendant(self, node_id: int, ancestor_id: int) -> bool:
+        return any(node == ancestor_id for node in self._ancestors(node_id))
+
+    def _subtree(self, node_id: int) -> Iterator[int]:
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(self.children[current])
+
+    @staticmethod
+    def _count(counter: Counter, key: int, delta: int) -> None:
+        counter[key] += delta
+        if not counter[key]:
+            del counter[key]
+
+
+org_analytics = OrgAnalytics()
+
+
+@changefeed.on_change
+def update_analytics(old: Optional[OrgSnapshot], new: OrgSnapshot, changed_ids: Optional[Set[int]]) -> None:
+    """
+    Keep the analytics of this worker in step with the change feed.
+
+    Args:
+        old (Optional[OrgSnapshot]): The previous snapshot.
+        new (OrgSnapshot): The current snapshot.
+        changed_ids (Optional[Set[int]]): Internal ids of the changed users, None if unknown.
+    """
+    org_analytics.apply(old, new, changed_ids)
+    if current_app.config.get("ORG_ANALYTICS_VERIFY"):
+        # A request may have moved the aggregates past `new` already.
+        snapshot = org_analytics.snapshot
+        mismatches = org_analytics.verify(snapshot)
+        if mismatches:
+            logger.error("Incremental org analytics diverged for %d nodes, rebuilding", len(mismatches))
+            org_analytics.rebuild(snapshot)
@@ -0,0 +1,301 @@
+"""
+Module containing management-chain queries: lowest common manager, chain membership and
+reporting paths.
+
+`ManagementChains` keeps binary-lifting ancestor tables of the org: row `k` holds every
+person's ancestor `2**k` levels up, roots pointing to themselves. A lowest common manager
+or an "is A in B's chain" check then takes O(log depth) steps instead of a walk up the
+tree, and batches of queries run as vectorized NumPy operations. When the org changes,
+only the rows of the moved subtrees are recomputed.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+import numpy as np
+
+from app.org.analytics import recompute
+from app.org.changefeed import changefeed
+from app.org.snapshot import OrgSnapshot, affected_nodes, changed_nodes
+
+
+class ManagementChains:
+    """
+    Ancestor tables of one worker, kept in step with the org snapshot.
+
+    Queries take and return internal user ids. Reporting cycles are broken the same way
+    as in the org analytics: the people involved are treated as roots.
+
+    Attributes:
+        version (Optional[int]): The org version the tables describe.
+        snapshot (Optional[OrgSnapshot]): The snapshot the tables describe.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.version: Optional[int] = None
+        self.snapshot: Optional[OrgSnapshot] = None
+        self._position: Dict[int, int] = {}
+        self._ids: List[Optional[int]] = []
+        self._up = np.zeros((1, 0), dtype=np.int64)
+        self._depth = np.zeros(0, dtype=np.int64)
+        self._children: Dict[int, Set[int]] = {}
+
+    def rebuild(self, snapshot: OrgSnapshot) -> None:
+        """
+        Build the tables from scratch.
+
+        Args:
+            snapshot (OrgSnapshot): The snapshot.
+        """
+        aggregates = recompute(snapshot)
+        size = len(snapshot)
+        positions = np.arange(size)
+        parent = np.where(aggregates.parent >= 0, aggregates.parent, positions)
+        capacity = size + size // 4 + 16
+        levels = int(aggregates.depth.max(initial=0)).bit_length() + 2
+
+        up = np.tile(np.arange(capacity, dtype=np.int64), (levels, 1))
+        up[0, :size] = parent
+        for level in range(1, levels):
+            up[level, :size] = up[level - 1, up[level - 1, :size]]
+        depth = np.zeros(capacity, dtype=np.int64)
+        depth[:size] = aggregates.depth
+
+        children: Dict[int, Set[int]] = {position: set() for position in range(size)}
+        for position, parent_position in enumerate(parent.tolist()):
+            if parent_position != position:
+                children[parent_position].add(position)
+
+        with self._lock:
+            self._ids = aggregates.ids.tolist()
+            self._position = {node_id: position for position, node_id in enumerate(self._ids)}
+            self._up, self._depth, self._children = up, depth, children
+            self.version, self.snapshot = snapshot.version, snapshot
+
+    def apply(self, old: Optional[OrgSnapshot], new: OrgSnapshot, changed_ids: Optional[Set[int]]) -> None:
+        """
+        Bring the tables from `old` to `new`, recomputing only the moved subtrees.
+
+        Args:
+            old (Optional[OrgSnapshot]): The previous snapshot, None if unknown.
+            new (OrgSnapshot): The current snapshot.
+            changed_ids (Optional[Set[int]]): Internal ids of the changed users, None if unknown.
+        """
+        with self._lock:
+            if self.version is not None and self.version >= new.version:
+                # A request pinned the tables to this or a newer version already.
+                return
+            if old is None or changed_ids is None or self.version != old.version:
+                self.rebuild(new)
+                return
+
+            affected = affected_nodes(old, new, changed_ids)
+
+            moved = set()
+            for node_id in affected:
+                if node_id not in new.nodes and node_id in self._position:
+                    position = self._position.pop(node_id)
+                    self._ids[position] = None
+                    self._detach(position)
+                    for child in list(self._children[position]):
+                        self._detach(child)
+                        moved.add(child)
+                    del self._children[position]
+            present = [node_id for node_id in affected if node_id in new.nodes]
+            for node_id in present:
+                if node_id not in self._position:
+                    self._allocate(node_id)
+                position = self._position[node_id]
+                self._detach(position)
+                moved.add(position)
+            # Attach after detaching everything, so no attachment is judged against a stale chain.
+            for node_id in present:
+                position = self._position[node_id]
+                manager = self._position.get(new.nodes[node_id].manager_id)
+                if manager is not None and position not in self._walk(manager):
+                    self._up[0, position] = manager
+                    self._children[manager].add(position)
+
+            self._refresh(moved)
+            self.version, self.snapshot = new.version, new
+            if int(self._depth.max(initial=0)) >= 1 << (len(self._up) - 1):
+                self.rebuild(new)
+
+    @contextmanager
+    def pinned(self, snapshot: OrgSnapshot) -> Iterator["ManagementChains"]:
+        """
+        Hold the tables at the version of a snapshot, or a newer one.
+
+        Change-feed updates wait until the block ends, so ids resolved with the tables'
+        `snapshot` inside the block stay valid for every query in it. A snapshot one version
+        ahead is applied incrementally, and only a larger gap rebuilds. An older snapshot,
+        e.g. one a request fetched just before the change feed moved on, does not rebuild
+        the tables backwards.
+
+        Args:
+            snapshot (OrgSnapshot): The newest snapshot known to the caller.
+
+        Yields:
+            ManagementChains: The tables.
+        """
+        with self._lock:
+            current = self.snapshot
+            if current is None or snapshot.version > current.version + 1:
+                self.rebuild(snapshot)
+            elif snapshot.version == current.version + 1:
+                self.apply(current, snapshot, changed_nodes(current, snapshot))
+            yield self
+
+    def lowest_common_managers(self, first: Sequence[int], second: Sequence[int]) -> List[Optional[int]]:
+        """
+        Find the lowest common manager of many pairs of people.
+
+        A person counts as their own manager here, so the result for a manager and one of
+        their reports is the manager.
+
+        Args:
+            first (Sequence[int]): Internal ids of the first person of every pair.
+            second (Sequence[int]): Internal ids of the second person of every pair.
+
+        Returns:
+            List[Optional[int]]: The lowest common manager of every pair, None if the two
+                belong to different trees.
+        """
+        with self._lock:
+            a, b = self._positions(first), self._positions(second)
+            deeper = self._depth[a] < self._depth[b]
+            a, b = np.where(deeper, b, a), np.where(deeper, a, b)
+            a = self._lift(a, self._depth[a] - self._depth[b])
+            for level in reversed(range(len(self._up))):
+                up_a, up_b = self._up[level, a], self._up[level, b]
+                differ = up_a != up_b
+                a, b = np.where(differ, up_a, a), np.where(differ, up_b, b)
+            parent_a, parent_b = self._up[0, a], self._up[0, b]
+            result = np.where(a == b, a, np.where(parent_a == parent_b, parent_a, -1))
+            return [self._ids[position] if position >= 0 else None for position in result.tolist()]
+
+    def in_chain(self, managers: Sequence[int], reports: Sequence[int]) -> List[bool]:
+        """
+        Check for many pairs whether the manager is in the report's management chain.
+
+        Args:
+            managers (Sequence[int]): Internal ids of the managers.
+            reports (Sequence[int]): Internal ids of the reports.
+
+        Returns:
+            List[bool]: True where the manager is a direct or indirect manager of the report.
+        """
+        with self._lock:
+            manager, report = self._positions(managers), self._positions(reports)
+            distance = self._depth[report] - self._depth[manager]
+            above = self._lift(report, np.maximum(distance, 0))
+            return ((distance > 0) & (above == manager)).tolist()
+
+    def chain(self, node_id: int) -> List[int]:
+        """
+        Return a person's management chain.
+
+        Args:
+            node_id (int): Internal id of the person.
+
+        Returns:
+            List[int]: The direct manager first, the root last.
+        """
+        with self._lock:
+            return [self._ids[position] for position in self._walk(self._position[node_id])][1:]
+
+    def path(self, source: int, target: int) -> Optional[List[int]]:
+        """
+        Return the reporting path between two people.
+
+        Args:
+            source (int): Internal id of the first person.
+            target (int): Internal id of the second person.
+
+        Returns:
+            Optional[List[int]]: The people from `source` up to the lowest common manager and
+                down to `target`, both included; None if they belong to different trees.
+        """
+        with self._lock:
+            (manager,) = self.lowest_common_managers([source], [target])
+            if manager is None:
+                return None
+            up = self._chain_until(source, manager)
+            down = self._chain_until(target, manager)
+            return up + [manager] + down[::-1]
+
+    def _chain_until(self, node_id: int, ancestor_id: int) -> List[int]:
+        chain = []
+        position, stop = self._position[node_id], self._position[ancestor_id]
+        while position != stop:
+            chain.append(self._ids[position])
+            position = int(self._up[0, position])
+        return chain
+
+    def _positions(self, node_ids: Sequence[int]) -> np.ndarray:
+        return np.fromiter((self._position[node_id] for node_id in node_ids), dtype=np.int64, count=len(node_ids))
+
+    def _lift(self, positions: np.ndarray, steps: np.ndarray) -> np.ndarray:
+        for level in range(len(self._up)):
+            positions = np.where((steps >> level) & 1, self._up[level, positions], positions)
+        return positions
+
+    def _walk(self, position: int) -> Iterator[int]:
+        while True:
+            yield position
+            parent = int(self._up[0, position])
+            if parent == position:
+                return
+            position = parent
+
+    def _detach(self, position: int) -> None:
+        parent = int(self._up[0, position])
+        if parent != position:
+            self._children[parent].discard(position)
+            self._up[0, position] = position
+
+    def _allocate(self, node_id: int) -> None:
+        position = len(self._ids)
+        if position == self._up.shape[1]:
+            capacity = 2 * position + 16
+            up = np.tile(np.arange(capacity, dtype=np.int64), (len(self._up), 1))
+            up[:, :position] = self._up
+            depth = np.zeros(capacity, dtype=np.int64)
+            depth[:position] = self._depth
+            self._up, self._depth = up, depth
+        self._ids.append(node_id)
+        self._position[node_id] = position
+        self._children[position] = set()
+        self._up[:, position] = position
+        self._depth[position] = 0
+
+    def _refresh(self, moved: Set[int]) -> None:
+        # Start at the moved people without a moved ancestor; their parents' rows are current.
+        tops = [position for position in moved if not any(p in moved for p in list(self._walk(position))[1:])]
+        frontier = np.array(tops, dtype=np.int64)
+        while len(frontier):
+            parent = self._up[0, frontier]
+            self._depth[frontier] = np.where(parent == frontier, 0, self._depth[parent] + 1)
+            for level in range(1, len(self._up)):
+                self._up[level, frontier] = self._up[level - 1, self._up[level - 1, frontier]]
+            frontier = np.array(
+                [child for position in frontier.tolist() for child in self._children[position]], dtype=np.int64
+            )
+
+
+management_chains = ManagementChains()
+
+
+@changefeed.on_change
+def update_chains(old: Optional[OrgSnapshot], new: OrgSnapshot, changed_ids: Optional[Set[int]]) -> None:
+    """
+    Keep the management chains of this worker in step with the change feed.
+
+    Args:
+        old (Optional[OrgSnapshot]): The previous snapshot.
+        new (OrgSnapshot): The current snapshot.
+        changed_ids (Optional[Set[int]]): Internal ids of the changed users, None if unknown.
+    """
+    management_chains.apply(old, new, changed_ids)
@@ -0,0 +1,352 @@
+"""
+Module containing the org change feed.
+
+Committed changes to users or reporting lines bump the org version and are announced with
+PostgreSQL NOTIFY. Every worker runs a single listener connection that invalidates the
+local snapshot, runs the registered change handlers and pushes compact diffs to the open
+Server-Sent Events streams.
+"""
+
+import itertools
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from flask import Flask
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.org.snapshot import OrgSnapshot, snapshots
+from app.users.models import User
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "org_changes"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more.
+MAX_PAYLOAD_SIZE = 7900
+# Seconds to wait before reconnecting the listener, doubled after every failed attempt.
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 30
+# Only these attributes are part of the org snapshot; e.g. `last_login` updates are not org changes.
+TRACKED_ATTRIBUTES = ("public_id", "username", "email", "role", "employee_id", "manager_id")
+
+_PENDING_KEY = "org_changes.pending"
+_VERSION_KEY = "org_changes.version"
+
+ChangeHandler = Callable[[Optional[OrgSnapshot], OrgSnapshot, Optional[Set[int]]], None]
+
+
+def encode_payload(version: int, changed_ids: Iterable[int]) -> str:
+    """
+    Encode a NOTIFY payload.
+
+    Args:
+        version (int): The org version created by the transaction.
+        changed_ids (Iterable[int]): Internal ids of the changed users.
+
+    Returns:
+        str: The payload. If the ids do not fit, they are omitted and listeners resync fully.
+    """
+    payload = json.dumps({"v": version, "ids": sorted(set(changed_ids))}, separators=(",", ":"))
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        payload = json.dumps({"v": version, "ids": None}, separators=(",", ":"))
+    return payload
+
+
+def decode_payload(payload: str) -> Tuple[int, Optional[List[int]]]:
+    """
+    Decode a NOTIFY payload.
+
+    Args:
+        payload (str): The payload produced by `encode_payload`.
+
+    Returns:
+        Tuple[int, Optional[List[int]]]: The org version and the changed ids, or None for a full resync.
+    """
+    data = json.loads(payload)
+    return data["v"], data["ids"]
+
+
+def build_diff(old: Optional[OrgSnapshot], new: OrgSnapshot, changed_ids: Optional[Iterable[int]]) -> dict:
+    """
+    Build the compact diff pushed to chart views.
+
+    Args:
+        old (Optional[OrgSnapshot]): The snapshot the subscribers currently know.
+        new (OrgSnapshot): The snapshot after the change.
+        changed_ids (Optional[Iterable[int]]): Internal ids of the changed users, None if unknown.
+
+    Returns:
+        dict: Either `{"version", "upserts", "deletes"}` or `{"version", "reset": True}`.
+    """
+    if old is None or changed_ids is None:
+        return {"version": new.version, "reset": True}
+
+    upserts, deletes = {}, []
+    for node_id in changed_ids:
+        node = new.nodes.get(node_id)
+        if node is not None:
+            upserts[node_id] = new.to_dict(node)
+        elif node_id in old.nodes:
+            deletes.append(old.nodes[node_id].public_id)
+            # The database detaches the reports of a removed manager without the ORM noticing.
+            for child_id in old.children.get(node_id, ()):
+                if child_id in new.nodes:
+                    upserts[child_id] = new.to_dict(new.nodes[child_id])
+    return {"version": new.version, "upserts": list(upserts.values()), "deletes": deletes}
+
+
+def _is_org_change(session: Session, obj: object) -> bool:
+    if not isinstance(obj, User):
+        return False
+    if obj in session.new or obj in session.deleted:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:  # noqa: U100
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if _is_org_change(session, obj):
+            pending.add(obj.id)
+
+
+@event.listens_for(db.session, "before_commit")
+def _announce_changes(session: Session) -> None:
+    # The final flush of a commit runs after this hook, so flush now to see every change.
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # NOTIFY is transactional: PostgreSQL delivers it only once this transaction commits,
+    # so a rolled back change is never announced.
+    version = session.execute(
+        text(
+            "UPDATE org_state SET version = version + 1, changed_at = timezone('utc', now()) "
+            "WHERE id = 1 RETURNING version"
+        )
+    ).scalar_one()
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": encode_payload(version, pending)},
+    )
+    session.info[_VERSION_KEY] = version
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidate_local_snapshot(session: Session) -> None:
+    version = session.info.pop(_VERSION_KEY, None)
+    if version is not None:
+        # Read-your-writes for this worker; the listener will hear about it as well.
+        snapshots.invalidate(version)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_VERSION_KEY, None)
+
+
+class Broadcaster:
+    """Fan-out of change feed messages to the open streams of this worker."""
+
+    def __init__(self, maxsize: int = 100) -> None:
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._subscribers: Set[queue.Queue] = set()
+
+    def subscribe(self, limit: Optional[int] = None) -> Optional[queue.Queue]:
+        """
+        Register a new subscriber.
+
+        Args:
+            limit (Optional[int]): Refuse the subscriber if this many are registered already.
+
+        Returns:
+            Optional[queue.Queue]: The queue receiving the published messages, or None if
+                the limit is reached.
+        """
+        subscription: queue.Queue = queue.Queue(maxsize=self._maxsize)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: queue.Queue) -> None:
+        """
+        Remove a subscriber.
+
+        Args:
+            subscription (queue.Queue): The queue returned by `subscribe`.
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, message: dict) -> None:
+        """
+        Send a message to every subscriber without blocking.
+
+        A subscriber that fell `maxsize` messages behind has its backlog replaced by a
+        single reset message, so a stalled client cannot grow memory without bound.
+
+        Args:
+            message (dict): The message, containing at least a `version` key.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait({"version": message["version"], "reset": True})
+
+    def __len__(self) -> int:
+        """Return the number of subscribers."""
+        return len(self._subscribers)
+
+
+class ChangeFeed:
+    """
+    Flask extension running the per-worker change feed listener.
+
+    The listener thread is started lazily on the first request, so every forked
+    gunicorn worker owns exactly one LISTEN connection.
+    """
+
+    def __init__(self) -> None:
+        self.broadcaster = Broadcaster()
+        self._handlers: List[ChangeHandler] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._last: Optional[OrgSnapshot] = None
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the change feed with the application.
+
+        Args:
+            app (Flask): The Flask application instance.
+        """
+        app.extensions["changefeed"] = self
+        if app.config.get("ORG_CHANGEFEED_ENABLED", True):
+            app.before_request(lambda: self.start(app))
+
+    def on_change(self, handler: ChangeHandler) -> ChangeHandler:
+        """
+        Register a handler called with `(old, new, changed_ids)` after every change.
+
+        Handlers run in the listener thread inside an application context. `old` is None
+        and `changed_ids` is None when the handler has to recompute fully.
+
+        Args:
+            handler (ChangeHandler): The handler to register.
+
+        Returns:
+            ChangeHandler: The handler, so this can be used as a decorator.
+        """
+        self._handlers.append(handler)
+        return handler
+
+    def start(self, app: Flask) -> None:
+        """
+        Start the listener thread of this worker unless it is already running.
+
+        Args:
+            app (Flask): The Flask application instance.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), name="org-changefeed", daemon=True)
+            self._thread.start()
+
+    def publish(self, app: Flask, version: Optional[int], changed_ids: Optional[Set[int]]) -> None:
+        """
+        Reload the snapshot and notify handlers and subscribers about a change.
+
+        Args:
+            app (Flask): The Flask application instance.
+            version (Optional[int]): The newest org version, None if unknown.
+            changed_ids (Optional[Set[int]]): Internal ids of the changed users, None for a full resync.
+        """
+        snapshots.invalidate(version)
+        with app.app_context():
+            new = snapshots.get()
+            old, self._last = self._last, new
+            if changed_ids is None:
+                old = None
+            for handler in self._handlers:
+                try:
+                    handler(old, new, changed_ids)
+                except Exception:  # noqa: B902
+                    logger.exception("Org change handler %r failed", handler)
+        self.broadcaster.publish(build_diff(old, new, changed_ids))
+
+    def _run(self, app: Flask) -> None:
+        backoff = RECONNECT_DELAY
+        while True:
+            try:
+                raw_connection = self._connect(app)
+            except Exception:  # noqa: B902
+                logger.exception("Org change feed could not connect, retrying in %ss", backoff)
+            else:
+                # Only consecutive failures to connect grow the delay.
+                backoff = RECONNECT_DELAY
+                try:
+                    self._listen(app, raw_connection)
+                except Exception:  # noqa: B902
+                    logger.exception("Org change feed listener failed, reconnecting in %ss", backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_RECONNECT_DELAY)
+
+    def _connect(self, app: Flask):
+        with app.app_context():
+            raw_connection = db.engine.raw_connection()
+        # The listener owns its connection for good, so keep it out of the request pool.
+        raw_connection.detach()
+        try:
+            connection = raw_connection.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+        except BaseException:
+            raw_connection.close()
+            raise
+        return raw_connection
+
+    def _listen(self, app: Flask, raw_connection) -> None:
+        connection = raw_connection.driver_connection
+        try:
+            # Changes may have been missed before LISTEN took effect, so start from a full resync.
+            self.publish(app, None, None)
+            while True:
+                if select.select([connection], [], [], 5.0) == ([], [], []):
+                    continue
+                connection.poll()
+                version, changed_ids = None, set()
+                # Coalesce a burst of notifications into a single reload.
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    notify_version, notify_ids = decode_payload(notify.payload)
+                    version = notify_version if version is None else max(version, notify_version)
+                    changed_ids = None if changed_ids is None or notify_ids is None else changed_ids | set(notify_ids)
+                if version is not None:
+                    self.publish(app, version, changed_ids)
+        finally:
+            snapshots.invalidate()
+            raw_connection.close()
+
+
+changefeed = ChangeFeed()
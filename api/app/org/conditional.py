@@ -0,0 +1,87 @@
+"""
+Module containing conditional GET support for org endpoints.
+
+Every org representation is derived from the org snapshot, so the org version is a
+valid validator for all of them. A matching `If-None-Match` or `If-Modified-Since`
+is answered with 304 before the view runs, i.e. without serializing the body.
+"""
+
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable
+
+from flask import current_app, make_response, request
+from werkzeug.wrappers import Response
+
+from app.org.snapshot import get_snapshot
+
+# Flask-Compress appends the content coding to the ETag of compressed responses.
+ENCODING_SUFFIXES = ("", ":br", ":gzip", ":deflate")
+
+
+def org_etag(version: int) -> str:
+    """
+    Return the (unquoted) ETag of an org version.
+
+    Args:
+        version (int): The org version.
+
+    Returns:
+        str: The ETag value.
+    """
+    return f"org-{version}"
+
+
+def is_not_modified(etag: str, last_modified: datetime) -> bool:
+    """
+    Evaluate the conditional headers of the current request.
+
+    `If-None-Match` takes precedence over `If-Modified-Since` as required by RFC 9110.
+
+    Args:
+        etag (str): The current ETag.
+        last_modified (datetime): The current modification time, timezone aware.
+
+    Returns:
+        bool: True if the client copy is still fresh.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match:
+        return if_none_match.star_tag or any(if_none_match.contains_weak(etag + suffix) for suffix in ENCODING_SUFFIXES)
+    if request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(view: Callable) -> Callable:
+    """
+    Add org version validators to a view and answer revalidations with 304.
+
+    Args:
+        view (Callable): A view whose response only depends on the org snapshot and the URL.
+
+    Returns:
+        Callable: The wrapped view.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs) -> Response:
+        snapshot = get_snapshot()
+        etag = org_etag(snapshot.version)
+        last_modified = snapshot.changed_at.replace(tzinfo=timezone.utc, microsecond=0)
+
+        if is_not_modified(etag, last_modified):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        # The body may be newer than this label but never older, so a 304 is never stale.
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
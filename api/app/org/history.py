@@ -0,0 +1,298 @@
+"""
+Module containing the point-in-time history of the organization.
+
+Every change to a user is recorded by the `users_history` trigger as a row of
+`user_versions` with a validity interval. Full compressed snapshots are taken every
+`ORG_HISTORY_SNAPSHOT_INTERVAL` changes, so reconstructing the org as of any date costs
+one snapshot load plus the replay of about that many versions. The org cannot be
+reconstructed before the first full snapshot, which workers take right after start-up.
+"""
+
+import json
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.org.changefeed import changefeed
+from app.org.models import OrgSnapshotRecord, UserVersion
+from app.org.snapshot import OrgNode, OrgSnapshot, load_snapshot
+from app.users.models import Role
+
+# Advisory lock key serializing snapshot takers across workers.
+SNAPSHOT_LOCK_ID = 0x6F7267
+
+# Versions written by transactions still running are invisible to a snapshot taken now;
+# all of them are stamped no earlier than the start of their transaction.
+REPLAY_FROM_SQL = text(
+    "SELECT least(timezone('utc', clock_timestamp()), min(timezone('utc', xact_start))) "
+    "FROM pg_stat_activity WHERE backend_xid IS NOT NULL AND datname = current_database()"
+)
+
+
+class HistoryNotAvailable(LookupError):
+    """Raised when the org is requested as of a time before the first full snapshot."""
+
+
+def parse_point_in_time(value: Any) -> datetime:
+    """
+    Parse the point in time a historical org is requested at.
+
+    Args:
+        value (Any): An ISO 8601 date or datetime. A bare date means the end of that day (UTC).
+
+    Returns:
+        datetime: The point in time as naive UTC.
+
+    Raises:
+        ValueError: If the value is not such a date or datetime, or out of range.
+    """
+    if not isinstance(value, str):
+        raise ValueError("as_of must be an ISO 8601 date or datetime.")
+    try:
+        as_of = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if len(value) == 10:
+            as_of += timedelta(days=1, microseconds=-1)
+        if as_of.tzinfo is not None:
+            as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError("as_of must be an ISO 8601 date or datetime.") from None
+    except OverflowError:
+        # E.g. 0001-01-01T00:00+14:00 is before datetime.min in UTC.
+        raise ValueError("as_of is out of range.") from None
+    return as_of
+
+
+def encode_nodes(nodes: Iterable[OrgNode]) -> bytes:
+    """
+    Serialize and compress the nodes of a full snapshot.
+
+    Args:
+        nodes (Iterable[OrgNode]): The nodes to store.
+
+    Returns:
+        bytes: zlib compressed JSON rows.
+    """
+    rows = [
+        [node.id, str(node.public_id), node.username, node.email, node.role.name, node.employee_id, node.manager_id]
+        for node in nodes
+    ]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_nodes(payload: bytes) -> Dict[int, OrgNode]:
+    """
+    Decompress the nodes of a full snapshot.
+
+    Args:
+        payload (bytes): The payload produced by `encode_nodes`.
+
+    Returns:
+        Dict[int, OrgNode]: The nodes keyed by internal id.
+    """
+    return {
+        row[0]: OrgNode(row[0], uuid.UUID(row[1]), row[2], row[3], Role[row[4]], row[5], row[6])
+        for row in json.loads(zlib.decompress(payload))
+    }
+
+
+def begin_snapshot_transaction(session: Session) -> datetime:
+    """
+    Commit the session and start a REPEATABLE READ transaction for reading a full snapshot.
+
+    Writers are not blocked. Instead, the returned time lies before every version the
+    snapshot cannot see: it is read before the snapshot, and it is no later than the start
+    of any transaction then writing. Replaying from there may repeat versions that are
+    already in the payload, which is harmless, but never misses one.
+
+    Args:
+        session (Session): The session to read with.
+
+    Returns:
+        datetime: The time from which versions must be replayed on top of the snapshot, naive UTC.
+    """
+    session.commit()
+    replay_from = session.execute(REPLAY_FROM_SQL).scalar_one()
+    session.commit()
+    session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    return replay_from
+
+
+def take_snapshot(session: Session, replay_from: Optional[datetime] = None) -> OrgSnapshotRecord:
+    """
+    Store a full snapshot of the current organization.
+
+    Args:
+        session (Session): The session to write with; pending changes are committed first,
+            the caller commits the snapshot.
+        replay_from (Optional[datetime]): The time returned by `begin_snapshot_transaction`,
+            if the caller already started the snapshot transaction.
+
+    Returns:
+        OrgSnapshotRecord: The new snapshot record.
+    """
+    if replay_from is None:
+        replay_from = begin_snapshot_transaction(session)
+    snapshot = load_snapshot(session)
+    # Read after the transaction snapshot was set, so no version in the payload is newer.
+    # The history trigger uses clock_timestamp() as well, so both sides use the same clock.
+    taken_at = session.execute(select(func.timezone("utc", func.clock_timestamp()))).scalar_one()
+    record = OrgSnapshotRecord(
+        version=snapshot.version,
+        taken_at=taken_at,
+        replay_from=replay_from,
+        node_count=len(snapshot),
+        payload=encode_nodes(snapshot.nodes.values()),
+    )
+    session.add(record)
+    return record
+
+
+def count_changes_since(session: Session, since: datetime, limit: int) -> int:
+    """
+    Count the user versions started or ended after a point in time.
+
+    Args:
+        session (Session): The session to read with.
+        since (datetime): The point in time.
+        limit (int): Stop counting at this number.
+
+    Returns:
+        int: The number of changes, at most `limit`.
+    """
+    changes = (
+        select(UserVersion.id)
+        .where(or_(UserVersion.valid_from > since, UserVersion.valid_to > since))
+        .limit(limit)
+        .subquery()
+    )
+    return session.execute(select(func.count()).select_from(changes)).scalar_one()
+
+
+def take_snapshot_if_due(session: Session, interval: int) -> Optional[OrgSnapshotRecord]:
+    """
+    Take a snapshot if at least `interval` changes happened since the last one.
+
+    Only one process checks at a time; the others skip instead of waiting. Pending
+    changes of the session are committed first.
+
+    Args:
+        session (Session): The session to write with; the caller commits.
+        interval (int): The number of changes between two snapshots.
+
+    Returns:
+        Optional[OrgSnapshotRecord]: The new snapshot record, or None if none was due.
+    """
+    replay_from = begin_snapshot_transaction(session)
+    if not session.execute(select(func.pg_try_advisory_xact_lock(SNAPSHOT_LOCK_ID))).scalar_one():
+        return None
+    last_taken_at = session.execute(select(func.max(OrgSnapshotRecord.taken_at))).scalar()
+    if last_taken_at is not None and count_changes_since(session, last_taken_at, interval) < interval:
+        return None
+    return take_snapshot(session, replay_from)
+
+
+def load_snapshot_as_of(session: Session, as_of: datetime) -> OrgSnapshot:
+    """
+    Reconstruct the organization as it was at a point in time.
+
+    Loads the latest full snapshot taken before `as_of` and replays the user versions
+    started or ended between its `replay_from` and `as_of`. A user touched in that window is in the org at
+    `as_of` exactly if one of the replayed versions is valid at `as_of`.
+
+    Args:
+        session (Session): The session to read with.
+        as_of (datetime): The point in time, naive UTC.
+
+    Returns:
+        OrgSnapshot: The org at `as_of`, labelled with the version of the full snapshot used.
+
+    Raises:
+        HistoryNotAvailable: If `as_of` is before the first full snapshot.
+    """
+    base = session.execute(
+        select(OrgSnapshotRecord)
+        .where(OrgSnapshotRecord.taken_at <= as_of)
+        .order_by(OrgSnapshotRecord.taken_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+    if base is None:
+        raise HistoryNotAvailable(f"The org history starts after {as_of.isoformat()}.")
+    nodes = decode_nodes(base.payload)
+    window = or_(
+        and_(UserVersion.valid_from > base.replay_from, UserVersion.valid_from <= as_of),
+        and_(UserVersion.valid_to > base.replay_from, UserVersion.valid_to <= as_of),
+    )
+
+    rows = session.execute(
+        select(
+            UserVersion.user_id,
+            UserVersion.public_id,
+            UserVersion.username,
+            UserVersion.email,
+            UserVersion.role,
+            UserVersion.employee_id,
+            UserVersion.manager_id,
+            UserVersion.valid_from,
+            UserVersion.valid_to,
+        ).where(window)
+    )
+    touched: Set[int] = set()
+    current: Dict[int, OrgNode] = {}
+    for *fields, valid_from, valid_to in rows:
+        touched.add(fields[0])
+        if valid_from <= as_of and (valid_to is None or valid_to > as_of):
+            current[fields[0]] = OrgNode(*fields)
+    for user_id in touched:
+        if user_id in current:
+            nodes[user_id] = current[user_id]
+        else:
+            nodes.pop(user_id, None)
+    return OrgSnapshot(base.version, as_of, nodes.values())
+
+
+class SnapshotPolicy:
+    """
+    Change handler taking a full snapshot every `ORG_HISTORY_SNAPSHOT_INTERVAL` changes.
+
+    Each worker counts the changes it is notified about and only asks the database once
+    its count reaches the interval, so the check costs nothing on most changes.
+    """
+
+    def __init__(self) -> None:
+        self._changes = None
+
+    def __call__(self, old: Optional[OrgSnapshot], new: OrgSnapshot, changed_ids: Optional[Set[int]]) -> None:
+        """
+        Count a change and take a snapshot when one is due.
+
+        Args:
+            old (Optional[OrgSnapshot]): The previous snapshot.
+            new (OrgSnapshot): The current snapshot.
+            changed_ids (Optional[Set[int]]): Internal ids of the changed users, None if unknown.
+        """
+        interval = current_app.config["ORG_HISTORY_SNAPSHOT_INTERVAL"]
+        # Check right away after start-up and whenever the change set is unknown.
+        if self._changes is None or changed_ids is None:
+            self._changes = interval
+        else:
+            self._changes += len(changed_ids)
+        if self._changes < interval:
+            return
+
+        self._changes = 0
+        try:
+            take_snapshot_if_due(db.session, interval)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+snapshot_policy = changefeed.on_change(SnapshotPolicy())
@@ -0,0 +1,303 @@
+"""
+Module containing the background jobs of the org chart.
+
+- `org.export` writes the CSV export of large orgs without holding a request open.
+- `org.import` reassigns reporting lines from a CSV of `email,manager` rows; only admins
+  and HR may start it.
+- `org.layout` computes chart coordinates for the client to draw.
+
+Jobs run in job workers, which do not listen to the change feed, so every job reads the
+org fresh from the database instead of using the cached snapshot.
+"""
+
+import csv
+import io
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.jobs import JobContext, jobs
+from app.org.history import load_snapshot_as_of, parse_point_in_time
+from app.org.routes import EXPORT_CHUNK_SIZE, export_chunks
+from app.org.snapshot import OrgNode, OrgSnapshot, load_snapshot
+from app.users.models import Role, User
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_MAX_ERRORS = 100
+LAYOUT_PROGRESS_STEP = 1000
+
+
+def check_selection(root: Any = None, depth: Any = None) -> None:
+    """
+    Check the `root` and `depth` parameters of a job when it is enqueued.
+
+    Args:
+        root (Any): Public id of the subtree root, or None.
+        depth (Any): How many levels below the root to include, or None.
+
+    Raises:
+        ValueError: If either is malformed.
+    """
+    if root is not None:
+        try:
+            uuid.UUID(root)
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError("root must be a public id.") from None
+    if depth is not None and (isinstance(depth, bool) or not isinstance(depth, int) or depth < 0):
+        raise ValueError("depth must be a non-negative integer.")
+
+
+def check_export(root: Any = None, depth: Any = None, as_of: Any = None) -> None:
+    """
+    Check the parameters of an export job when it is enqueued.
+
+    Args:
+        root (Any): Public id of the subtree root, or None.
+        depth (Any): How many levels below the root to include, or None.
+        as_of (Any): ISO 8601 date or datetime of a historical export, or None.
+
+    Raises:
+        ValueError: If any of them is malformed.
+    """
+    check_selection(root, depth)
+    if as_of is not None:
+        parse_point_in_time(as_of)
+
+
+def select_nodes(snapshot: OrgSnapshot, root: Optional[str], depth: Optional[int]) -> Iterator[OrgNode]:
+    """
+    Walk the part of the snapshot a job asked for.
+
+    Args:
+        snapshot (OrgSnapshot): The snapshot to walk.
+        root (Optional[str]): Public id of the subtree root; the whole org if None.
+        depth (Optional[int]): How many levels below the root to include.
+
+    Returns:
+        Iterator[OrgNode]: The selected nodes, breadth-first.
+
+    Raises:
+        ValueError: If the root is unknown.
+    """
+    root_ids = None
+    if root is not None:
+        node = snapshot.get(root)
+        if node is None:
+            raise ValueError(f"Unknown root {root}.")
+        root_ids = [node.id]
+    return snapshot.subtree(root_ids, depth)
+
+
+@jobs.task("org.export", mimetype="text/csv", validate=check_export)
+def export_org(
+    context: JobContext, root: Optional[str] = None, depth: Optional[int] = None, as_of: Optional[str] = None
+) -> str:
+    """
+    Export the org as CSV.
+
+    Args:
+        context (JobContext): The running job.
+        root (Optional[str]): Public id of the person whose subtree is exported.
+        depth (Optional[int]): How many levels below the root to include.
+        as_of (Optional[str]): Export the org as it was at this ISO 8601 date or datetime.
+
+    Returns:
+        str: The CSV document.
+    """
+    if as_of is not None:
+        snapshot = load_snapshot_as_of(db.session, parse_point_in_time(as_of))
+    else:
+        snapshot = load_snapshot(db.session)
+    nodes = list(select_nodes(snapshot, root, depth))
+    chunks = []
+    for index, chunk in enumerate(export_chunks(snapshot, nodes), start=1):
+        chunks.append(chunk)
+        context.progress(min(index * EXPORT_CHUNK_SIZE, len(nodes)), len(nodes), "Writing rows")
+    return "".join(chunks)
+
+
+@jobs.task("org.import", roles=(Role.admin, Role.hr))
+def import_reporting_lines(context: JobContext, data: str) -> dict:
+    """
+    Reassign managers from CSV rows of `email,manager`; an empty manager removes it.
+
+    Rows naming unknown people are skipped and reported. The whole import is rejected if
+    it would create a reporting cycle. It is applied in a single transaction, i.e. as one
+    org version, so no intermediate state is ever visible; the cycle check is repeated
+    against the updated rows, which include changes made since the org was read.
+
+    Args:
+        context (JobContext): The running job.
+        data (str): The CSV document with a header row.
+
+    Returns:
+        dict: Numbers of updated and unchanged people and the skipped rows.
+
+    Raises:
+        ValueError: If columns are missing or the import would create a cycle.
+    """
+    reader = csv.DictReader(io.StringIO(data))
+    if not {"email", "manager"} <= set(reader.fieldnames or ()):
+        raise ValueError("The CSV needs the columns email and manager.")
+
+    snapshot = load_snapshot(db.session)
+    by_email = {node.email.lower(): node for node in snapshot.nodes.values()}
+    changes: Dict[int, Optional[int]] = {}
+    errors: List[str] = []
+    unchanged = 0
+    for line, row in enumerate(reader, start=2):
+        node = by_email.get((row["email"] or "").strip().lower())
+        manager_email = (row["manager"] or "").strip().lower()
+        manager = by_email.get(manager_email) if manager_email else None
+        if node is None or (manager_email and manager is None):
+            errors.append(f"line {line}: unknown {'email' if node is None else 'manager'}")
+            continue
+        manager_id = manager.id if manager is not None else None
+        if node.manager_id == manager_id:
+            unchanged += 1
+        else:
+            changes[node.id] = manager_id
+
+    parents = {node.id: node.manager_id for node in snapshot.nodes.values()}
+    parents.update(changes)
+    check_cycle(snapshot, parents, changes)
+
+    ids = sorted(changes)
+    try:
+        for start in range(0, len(ids), IMPORT_CHUNK_SIZE):
+            chunk = ids[start : start + IMPORT_CHUNK_SIZE]
+            for user in db.session.execute(select(User).where(User.id.in_(chunk))).scalars():
+                user.manager_id = changes[user.id]
+            db.session.flush()
+            context.progress(start + len(chunk), len(ids), "Updating reporting lines")
+        check_cycle(snapshot, dict(db.session.execute(select(User.id, User.manager_id)).tuples()), ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {"updated": len(ids), "unchanged": unchanged, "errors": errors[:IMPORT_MAX_ERRORS]}
+
+
+def check_cycle(snapshot: OrgSnapshot, parents: Dict[int, Optional[int]], start_ids: Sequence[int]) -> None:
+    """
+    Reject reporting lines that form a cycle through any of the given people.
+
+    Args:
+        snapshot (OrgSnapshot): The snapshot used to name the people on the cycle.
+        parents (Dict[int, Optional[int]]): Manager id of every person.
+        start_ids (Sequence[int]): The changed people.
+
+    Raises:
+        ValueError: If there is a cycle.
+    """
+    cycle = find_cycle(parents, start_ids)
+    if cycle:
+        names = ", ".join(snapshot.nodes[i].email if i in snapshot.nodes else f"#{i}" for i in cycle)
+        raise ValueError(f"The import would create a reporting cycle: {names}")
+
+
+def find_cycle(parents: Dict[int, Optional[int]], start_ids: Sequence[int]) -> List[int]:
+    """
+    Find a reporting cycle through any of the given people.
+
+    Only chains starting at changed people need checking: a cycle that does not contain a
+    changed person existed before.
+
+    Args:
+        parents (Dict[int, Optional[int]]): Manager id of every person.
+        start_ids (Sequence[int]): Where to start walking up.
+
+    Returns:
+        List[int]: The people on a cycle, or an empty list.
+    """
+    done = set()
+    for start in start_ids:
+        path: Dict[int, int] = {}
+        node_id = start
+        while node_id is not None and node_id not in done and node_id in parents:
+            if node_id in path:
+                return list(path)[path[node_id] :]
+            path[node_id] = len(path)
+            node_id = parents[node_id]
+        done.update(path)
+    return []
+
+
+def tidy_layout(
+    snapshot: OrgSnapshot,
+    root_ids: Optional[Sequence[int]] = None,
+    max_depth: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict[int, tuple]:
+    """
+    Compute chart coordinates: one column per leaf, managers centred above their reports.
+
+    Reports are ordered by name, so the layout is stable across runs. The walk is
+    iterative, so deep orgs cannot exhaust the recursion limit.
+
+    Args:
+        snapshot (OrgSnapshot): The snapshot to lay out.
+        root_ids (Optional[Sequence[int]]): Subtree roots; defaults to the org roots.
+        max_depth (Optional[int]): How many levels below the roots to include.
+        progress (Optional[Callable[[int], None]]): Called with the number of placed nodes.
+
+    Returns:
+        Dict[int, tuple]: `(x, y)` of every placed node by internal id; y is the level.
+    """
+
+    def name(node_id: int) -> str:
+        node = snapshot.nodes[node_id]
+        return (node.username or node.email).lower()
+
+    positions: Dict[int, tuple] = {}
+    seen = set()
+    column = 0
+    for root_id in sorted(snapshot.roots if root_ids is None else root_ids, key=name):
+        seen.add(root_id)
+        stack = [(root_id, 0, None)]
+        while stack:
+            node_id, depth, reports = stack.pop()
+            if reports is None:
+                reports = []
+                if max_depth is None or depth < max_depth:
+                    reports = sorted((i for i in snapshot.children.get(node_id, ()) if i not in seen), key=name)
+                    seen.update(reports)
+                if reports:
+                    stack.append((node_id, depth, reports))
+                    stack.extend((report_id, depth + 1, None) for report_id in reversed(reports))
+                    continue
+            if reports:
+                x = (positions[reports[0]][0] + positions[reports[-1]][0]) / 2
+            else:
+                x, column = column, column + 1
+            positions[node_id] = (x, depth)
+            if progress is not None and len(positions) % LAYOUT_PROGRESS_STEP == 0:
+                progress(len(positions))
+    return positions
+
+
+@jobs.task("org.layout", validate=check_selection)
+def layout_org(context: JobContext, root: Optional[str] = None, depth: Optional[int] = None) -> dict:
+    """
+    Compute the chart layout of the org or a subtree.
+
+    Args:
+        context (JobContext): The running job.
+        root (Optional[str]): Public id of the person whose subtree is laid out.
+        depth (Optional[int]): How many levels below the root to include.
+
+    Returns:
+        dict: The org version, the extent of the layout and the position of every node.
+    """
+    snapshot = load_snapshot(db.session)
+    root_ids = [node.id for node in select_nodes(snapshot, root, 0)] if root is not None else None
+    total = len(snapshot)
+    positions = tidy_layout(snapshot, root_ids, depth, lambda done: context.progress(done, total, "Placing nodes"))
+    return {
+        "version": snapshot.version,
+        "width": max((x for x, _ in positions.values()), default=-1) + 1,
+        "height": max((y for _, y in positions.values()), default=-1) + 1,
+        "nodes": [{"id": snapshot.nodes[i].public_id, "x": x, "y": y} for i, (x, y) in positions.items()],
+    }
@@ -0,0 +1,96 @@
+"""
+Module Description.
+
+This module defines the models describing the state and the history of the organization as a whole.
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, LargeBinary, String, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.users.models import Role
+
+
+class OrgState(Base):
+    """
+    Single-row table holding the current version of the organization.
+
+    The version is incremented inside every transaction that changes users or reporting
+    lines, so all workers agree on a monotonically increasing org version.
+    """
+
+    __tablename__ = "org_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the OrgState object.
+
+        Returns:
+            str: A string representation of the OrgState object.
+        """
+        return f"<OrgState(version={self.version!r}, changed_at={self.changed_at!r})>"
+
+
+class UserVersion(Base):
+    """
+    One version of a user's org attributes, valid from `valid_from` until `valid_to`.
+
+    Rows are written by the `users_history` trigger, so every change to users is recorded,
+    including reporting lines detached by the database on delete.
+    """
+
+    __tablename__ = "user_versions"
+    __table_args__ = (
+        Index(
+            "ix__user_versions__user_id_current",
+            "user_id",
+            unique=True,
+            postgresql_where=text("valid_to IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    public_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    username: Mapped[str] = mapped_column(String(120), nullable=True)
+    email: Mapped[str] = mapped_column(String(120), nullable=False)
+    role: Mapped[Role] = mapped_column(nullable=False)
+    employee_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    manager_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    valid_from: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    valid_to: Mapped[datetime] = mapped_column(DateTime, nullable=True, index=True)
+
+
+class OrgSnapshotRecord(Base):
+    """
+    A full, compressed copy of the organization taken at `taken_at`.
+
+    Reconstructing the org as of a date loads the latest record before that date and
+    replays the user versions changed since `replay_from`, so the replay is bounded by the
+    snapshot interval. `replay_from` precedes `taken_at` by the age of the oldest transaction
+    that was writing while the snapshot was read; its versions are not in the payload.
+    """
+
+    __tablename__ = "org_snapshots"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    taken_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    replay_from: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    node_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the OrgSnapshotRecord object.
+
+        Returns:
+            str: A string representation of the OrgSnapshotRecord object.
+        """
+        return f"<OrgSnapshotRecord(version={self.version!r}, taken_at={self.taken_at!r})>"
@@ -0,0 +1,398 @@
+"""Routes of the org chart API."""
+
+import csv
+import io
+import queue
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import click
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from werkzeug.exceptions import ServiceUnavailable
+
+from app.extensions import db
+from app.org.analytics import org_analytics
+from app.org.chains import management_chains
+from app.org.changefeed import changefeed
+from app.org.conditional import conditional
+from app.org.history import (
+    HistoryNotAvailable,
+    load_snapshot_as_of,
+    parse_point_in_time,
+    take_snapshot,
+    take_snapshot_if_due,
+)
+from app.org.snapshot import OrgNode, OrgSnapshot, get_snapshot
+from app.ratelimit import Limit, limiter
+
+org_bp = Blueprint("org", __name__, url_prefix="/org")
+
+EXPORT_COLUMNS = ("id", "username", "email", "role", "employee_id", "manager")
+EXPORT_CHUNK_SIZE = 1000
+SEARCH_MAX_LIMIT = 50
+CHAINS_BATCH_MAX_QUERIES = 5000
+CHAINS_BATCH_OPS = ("common_manager", "in_chain", "path")
+
+
+def format_event(event: str, data: str, event_id: int) -> str:
+    """
+    Format a single Server-Sent Event.
+
+    Args:
+        event (str): The event name.
+        data (str): The JSON encoded event data.
+        event_id (int): The event id, i.e. the org version.
+
+    Returns:
+        str: The event in the `text/event-stream` format.
+    """
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+def parse_as_of(value: str) -> datetime:
+    """
+    Parse the `as_of` query argument.
+
+    Args:
+        value (str): An ISO 8601 date or datetime. A bare date means the end of that day (UTC).
+
+    Returns:
+        datetime: The point in time as naive UTC.
+    """
+    try:
+        return parse_point_in_time(value)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+
+
+def export_chunks(snapshot: OrgSnapshot, nodes: Iterable[OrgNode]) -> Iterator[str]:
+    """
+    Serialize nodes as CSV.
+
+    Args:
+        snapshot (OrgSnapshot): The snapshot the nodes belong to.
+        nodes (Iterable[OrgNode]): The nodes to export.
+
+    Yields:
+        str: The header and rows, `EXPORT_CHUNK_SIZE` rows per chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, node in enumerate(nodes, start=1):
+        row = snapshot.to_dict(node)
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def requested_snapshot() -> Tuple[OrgSnapshot, Optional[datetime]]:
+    """
+    Return the snapshot selected by the `as_of` query argument.
+
+    Returns:
+        Tuple[OrgSnapshot, Optional[datetime]]: The current snapshot, or the org reconstructed at `as_of`.
+    """
+    if "as_of" not in request.args:
+        return get_snapshot(), None
+    as_of = parse_as_of(request.args["as_of"])
+    try:
+        return load_snapshot_as_of(db.session, as_of), as_of
+    except HistoryNotAvailable as exc:
+        abort(404, description=str(exc))
+
+
+def requested_nodes(snapshot: OrgSnapshot) -> Iterator[OrgNode]:
+    """
+    Walk the part of the snapshot selected by the `root` and `depth` query arguments.
+
+    Args:
+        snapshot (OrgSnapshot): The snapshot to walk.
+
+    Returns:
+        Iterator[OrgNode]: The selected nodes, breadth-first.
+    """
+    root_ids = None
+    if "root" in request.args:
+        root = snapshot.get(request.args["root"])
+        if root is None:
+            abort(404, description="Unknown root.")
+        root_ids = [root.id]
+    return snapshot.subtree(root_ids, request.args.get("depth", type=int))
+
+
+@org_bp.route("/chart", methods=["GET"])
+@conditional
+def chart():
+    """
+    Return the org chart as a flat list of nodes.
+
+    Query Args:
+        root (str): Public id of the person whose subtree is returned. Defaults to the whole org.
+        depth (int): How many levels below the root to include.
+        as_of (str): Return the org as it was at this date or datetime.
+    """
+    snapshot, as_of = requested_snapshot()
+    nodes = [snapshot.to_dict(node) for node in requested_nodes(snapshot)]
+    if as_of is not None:
+        return jsonify({"as_of": as_of, "nodes": nodes})
+    return jsonify({"version": snapshot.version, "nodes": nodes})
+
+
+@org_bp.route("/export", methods=["GET"])
+# The limiter comes first, so rejected requests never load a snapshot.
+@limiter.limit(per_client=Limit(rate=0.2, burst=3), per_endpoint=Limit(rate=2, burst=5), concurrency=2)
+@conditional
+def export():
+    """
+    Export the org as CSV, streamed in chunks.
+
+    Query Args:
+        root (str): Public id of the person whose subtree is exported. Defaults to the whole org.
+        depth (int): How many levels below the root to include.
+        as_of (str): Export the org as it was at this date or datetime.
+    """
+    snapshot, as_of = requested_snapshot()
+    nodes = requested_nodes(snapshot)
+    filename = f"org-{as_of:%Y%m%dT%H%M%S}.csv" if as_of is not None else f"org-v{snapshot.version}.csv"
+    return Response(
+        export_chunks(snapshot, nodes),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@org_bp.route("/search", methods=["GET"])
+@conditional
+def search():
+    """
+    Type-ahead search over usernames and emails.
+
+    Query Args:
+        q (str): The typed prefix, at least one character.
+        limit (int): Maximum number of results, at most SEARCH_MAX_LIMIT.
+    """
+    prefix = request.args.get("q", "").strip()
+    if not prefix:
+        abort(400, description="q must not be empty.")
+    limit = min(request.args.get("limit", 10, type=int), SEARCH_MAX_LIMIT)
+    snapshot = get_snapshot()
+    results = [snapshot.to_dict(node) for node in snapshot.search(prefix, limit)]
+    return jsonify({"version": snapshot.version, "results": results})
+
+
+@org_bp.route("/analytics", methods=["GET"])
+@conditional
+def analytics():
+    """
+    Return headcount, span of control and depth aggregates of the org.
+
+    Query Args:
+        root (str): Also return the aggregates of this person's subtree.
+    """
+    with org_analytics.pinned(get_snapshot()) as aggregates:
+        snapshot = aggregates.snapshot
+        root = None
+        if "root" in request.args:
+            root = snapshot.get(request.args["root"])
+            if root is None:
+                abort(404, description="Unknown root.")
+        body = aggregates.summary(snapshot)
+        if root is not None:
+            body = {**body, "root": {"id": root.public_id, **aggregates.node(root.id)}}
+    return jsonify(body)
+
+
+def requested_person(snapshot: OrgSnapshot, name: str) -> OrgNode:
+    """
+    Find the person named by a query argument, aborting with 404 if there is none.
+
+    Args:
+        snapshot (OrgSnapshot): The snapshot to search.
+        name (str): The query argument holding the public id.
+
+    Returns:
+        OrgNode: The person.
+    """
+    node = snapshot.get(request.args.get(name, ""))
+    if node is None:
+        abort(404, description=f"Unknown {name}.")
+    return node
+
+
+@org_bp.route("/chains/common-manager", methods=["GET"])
+@conditional
+def common_manager():
+    """
+    Return the lowest common manager of two people.
+
+    A person counts as their own manager, so for a manager and one of their reports the
+    result is the manager. It is null if the two belong to different trees.
+
+    Query Args:
+        a (str): Public id of the first person.
+        b (str): Public id of the second person.
+    """
+    with management_chains.pinned(get_snapshot()) as chains:
+        snapshot = chains.snapshot
+        first, second = requested_person(snapshot, "a"), requested_person(snapshot, "b")
+        (manager_id,) = chains.lowest_common_managers([first.id], [second.id])
+    manager = snapshot.to_dict(snapshot.nodes[manager_id]) if manager_id is not None else None
+    return jsonify({"version": snapshot.version, "manager": manager})
+
+
+@org_bp.route("/chains/in-chain", methods=["GET"])
+@conditional
+def in_chain():
+    """
+    Check whether a person is a direct or indirect manager of another.
+
+    Query Args:
+        manager (str): Public id of the manager.
+        report (str): Public id of the report.
+    """
+    with management_chains.pinned(get_snapshot()) as chains:
+        snapshot = chains.snapshot
+        manager, report = requested_person(snapshot, "manager"), requested_person(snapshot, "report")
+        (result,) = chains.in_chain([manager.id], [report.id])
+    return jsonify({"version": snapshot.version, "in_chain": result})
+
+
+@org_bp.route("/chains/path", methods=["GET"])
+@conditional
+def reporting_path():
+    """
+    Return the reporting path between two people: up to their lowest common manager and down again.
+
+    The path is null if the two belong to different trees.
+
+    Query Args:
+        from (str): Public id of the first person.
+        to (str): Public id of the second person.
+    """
+    with management_chains.pinned(get_snapshot()) as chains:
+        snapshot = chains.snapshot
+        source, target = requested_person(snapshot, "from"), requested_person(snapshot, "to")
+        path = chains.path(source.id, target.id)
+    nodes = [snapshot.to_dict(snapshot.nodes[node_id]) for node_id in path] if path is not None else None
+    return jsonify({"version": snapshot.version, "path": nodes})
+
+
+@org_bp.route("/chains/batch", methods=["POST"])
+@limiter.limit(per_client=Limit(rate=5, burst=20))
+def chains_batch():
+    """
+    Answer many chain queries at once, against one org version.
+
+    Common-manager and in-chain queries are answered together as vectorized lookups;
+    people are returned as public ids. A query naming an unknown person gets an `error`
+    instead of a result.
+
+    JSON Args:
+        queries (List[dict]): Queries of the form `{"op": ..., "a": ..., "b": ...}`, where
+            op is one of CHAINS_BATCH_OPS. For in_chain, `a` is the manager and `b` the report.
+    """
+    body = request.get_json(silent=True)
+    queries = body.get("queries") if isinstance(body, dict) else None
+    if not isinstance(queries, list):
+        abort(400, description="Send the queries as a list.")
+    if len(queries) > CHAINS_BATCH_MAX_QUERIES:
+        abort(400, description=f"At most {CHAINS_BATCH_MAX_QUERIES} queries can be sent at once.")
+    if any(not isinstance(query, dict) or query.get("op") not in CHAINS_BATCH_OPS for query in queries):
+        abort(400, description=f"Every query needs an op, one of {', '.join(CHAINS_BATCH_OPS)}.")
+
+    results: List[Optional[dict]] = [None] * len(queries)
+    grouped: Dict[str, List[Tuple[int, int, int]]] = {op: [] for op in CHAINS_BATCH_OPS}
+    with management_chains.pinned(get_snapshot()) as chains:
+        snapshot = chains.snapshot
+        for index, query in enumerate(queries):
+            first, second = snapshot.get(query.get("a", "")), snapshot.get(query.get("b", ""))
+            if first is None or second is None:
+                results[index] = {"error": "Unknown person."}
+            else:
+                grouped[query["op"]].append((index, first.id, second.id))
+
+        def public_id(node_id: Optional[int]) -> Optional[uuid.UUID]:
+            return snapshot.nodes[node_id].public_id if node_id is not None else None
+
+        if grouped["common_manager"]:
+            indices, first_ids, second_ids = zip(*grouped["common_manager"])
+            for index, manager_id in zip(indices, chains.lowest_common_managers(first_ids, second_ids)):
+                results[index] = {"manager": public_id(manager_id)}
+        if grouped["in_chain"]:
+            indices, manager_ids, report_ids = zip(*grouped["in_chain"])
+            for index, result in zip(indices, chains.in_chain(manager_ids, report_ids)):
+                results[index] = {"in_chain": result}
+        for index, first_id, second_id in grouped["path"]:
+            path = chains.path(first_id, second_id)
+            results[index] = {"path": [public_id(node_id) for node_id in path] if path is not None else None}
+    return jsonify({"version": snapshot.version, "results": results})
+
+
+@org_bp.route("/changes", methods=["GET"])
+def change_stream():
+    """
+    Stream compact org diffs as Server-Sent Events.
+
+    The first event is `hello` with the current org version, or a `diff` with `reset`
+    if the client reconnects with an older `Last-Event-ID`. The stream is closed after
+    `ORG_STREAM_MAX_SECONDS`; browsers reconnect on their own.
+
+    Every open stream holds a worker thread, so a worker serves at most
+    `ORG_STREAM_MAX_CONNECTIONS` of them and answers further ones with 503.
+    """
+    heartbeat = current_app.config["ORG_STREAM_HEARTBEAT"]
+    max_seconds = current_app.config["ORG_STREAM_MAX_SECONDS"]
+    dumps = current_app.json.dumps
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+
+    # Subscribe before reading the snapshot so no change can fall in between.
+    subscription = changefeed.broadcaster.subscribe(current_app.config["ORG_STREAM_MAX_CONNECTIONS"])
+    if subscription is None:
+        raise ServiceUnavailable(
+            "Too many open change streams, try again shortly.",
+            retry_after=current_app.config["ORG_STREAM_RETRY_AFTER"],
+        )
+    version = get_snapshot().version
+
+    def stream():
+        try:
+            if last_event_id is not None and last_event_id < version:
+                yield format_event("diff", dumps({"version": version, "reset": True}), version)
+            else:
+                yield format_event("hello", dumps({"version": version}), version)
+
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                try:
+                    message = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message["version"] > version or message.get("reset"):
+                    yield format_event("diff", dumps(message), message["version"])
+        finally:
+            changefeed.broadcaster.unsubscribe(subscription)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@org_bp.cli.command("snapshot")
+@click.option("--if-due", is_flag=True, help="Only take a snapshot if ORG_HISTORY_SNAPSHOT_INTERVAL changes happened.")
+def snapshot_command(if_due: bool) -> None:
+    """Store a full snapshot of the org for point-in-time queries."""
+    if if_due:
+        record = take_snapshot_if_due(db.session, current_app.config["ORG_HISTORY_SNAPSHOT_INTERVAL"])
+    else:
+        record = take_snapshot(db.session)
+    db.session.commit()
+    click.echo(f"Snapshot taken: {record!r}" if record is not None else "No snapshot due.")
@@ -0,0 +1,297 @@
+"""
+Module containing the in-memory snapshot of the organization.
+
+Every worker keeps one immutable snapshot of all users and their reporting lines. The
+snapshot is labelled with the org version it was read at and is reloaded lazily once the
+change feed reports a newer version.
+"""
+
+import bisect
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.org.models import OrgState
+from app.users.models import Role, User
+
+
+@dataclass(frozen=True, slots=True)
+class OrgNode:
+    """A single person in the org snapshot."""
+
+    id: int
+    public_id: uuid.UUID
+    username: Optional[str]
+    email: str
+    role: Role
+    employee_id: Optional[int]
+    manager_id: Optional[int]
+
+
+class OrgSnapshot:
+    """
+    Immutable view of the organization at a given org version.
+
+    Attributes:
+        version (int): The org version the snapshot was read at.
+        changed_at (datetime): When the org last changed, as of this snapshot.
+        nodes (Dict[int, OrgNode]): All people keyed by their internal id.
+        children (Dict[int, List[int]]): Direct reports keyed by the manager's internal id.
+        roots (List[int]): Ids of the people without a (known) manager.
+    """
+
+    def __init__(self, version: int, changed_at: datetime, nodes: Iterable[OrgNode]) -> None:
+        self.version = version
+        self.changed_at = changed_at
+        self.loaded_at = time.monotonic()
+        self.nodes: Dict[int, OrgNode] = {node.id: node for node in nodes}
+        self.by_public_id: Dict[uuid.UUID, OrgNode] = {node.public_id: node for node in self.nodes.values()}
+        self.children: Dict[int, List[int]] = {}
+        self.roots: List[int] = []
+        self._search_index: Optional[List[Tuple[str, int]]] = None
+        for node in self.nodes.values():
+            if node.manager_id is None or node.manager_id not in self.nodes:
+                self.roots.append(node.id)
+            else:
+                self.children.setdefault(node.manager_id, []).append(node.id)
+
+    def __len__(self) -> int:
+        """Return the number of people in the snapshot."""
+        return len(self.nodes)
+
+    def get(self, public_id: Union[str, uuid.UUID]) -> Optional[OrgNode]:
+        """
+        Find a person by public id.
+
+        Args:
+            public_id (Union[str, uuid.UUID]): The public id, as a UUID or its string form.
+
+        Returns:
+            Optional[OrgNode]: The matching node, or None if it is unknown or malformed.
+        """
+        if not isinstance(public_id, uuid.UUID):
+            try:
+                public_id = uuid.UUID(str(public_id))
+            except ValueError:
+                return None
+        return self.by_public_id.get(public_id)
+
+    def subtree(self, root_ids: Optional[Iterable[int]] = None, max_depth: Optional[int] = None) -> Iterator[OrgNode]:
+        """
+        Walk the org breadth-first.
+
+        Args:
+            root_ids (Optional[Iterable[int]]): Where to start; defaults to the org roots.
+            max_depth (Optional[int]): How many levels below the roots to include.
+
+        Yields:
+            OrgNode: Every reachable node, each at most once.
+        """
+        queue = deque((node_id, 0) for node_id in (self.roots if root_ids is None else root_ids))
+        seen = set()
+        while queue:
+            node_id, depth = queue.popleft()
+            if node_id in seen or node_id not in self.nodes:
+                continue
+            seen.add(node_id)
+            yield self.nodes[node_id]
+            if max_depth is None or depth < max_depth:
+                queue.extend((child_id, depth + 1) for child_id in self.children.get(node_id, ()))
+
+    def search(self, prefix: str, limit: int = 10) -> List[OrgNode]:
+        """
+        Find people whose username or email starts with a prefix, case-insensitively.
+
+        The sorted index is built on first use, once per snapshot, so every type-ahead
+        request is a binary search plus a scan of at most the matching keys.
+
+        Args:
+            prefix (str): The typed prefix.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[OrgNode]: The matching nodes, ordered by the matching key.
+        """
+        if self._search_index is None:
+            keys = [(node.email.lower(), node.id) for node in self.nodes.values()]
+            keys.extend((node.username.lower(), node.id) for node in self.nodes.values() if node.username)
+            self._search_index = sorted(keys)
+
+        prefix = prefix.lower()
+        found: Dict[int, OrgNode] = {}
+        position = bisect.bisect_left(self._search_index, (prefix,))
+        while len(found) < limit and position < len(self._search_index):
+            key, node_id = self._search_index[position]
+            if not key.startswith(prefix):
+                break
+            found.setdefault(node_id, self.nodes[node_id])
+            position += 1
+        return list(found.values())
+
+    def to_dict(self, node: OrgNode) -> dict:
+        """
+        Serialize a node for API responses, exposing public ids only.
+
+        Args:
+            node (OrgNode): The node to serialize.
+
+        Returns:
+            dict: The serialized node.
+        """
+        manager = self.nodes.get(node.manager_id) if node.manager_id is not None else None
+        return {
+            "id": node.public_id,
+            "username": node.username,
+            "email": node.email,
+            "role": node.role.value,
+            "employee_id": node.employee_id,
+            "manager": manager.public_id if manager is not None else None,
+        }
+
+
+def changed_nodes(old: OrgSnapshot, new: OrgSnapshot) -> Set[int]:
+    """
+    Find the people added, removed or moved to another manager between two snapshots.
+
+    Args:
+        old (OrgSnapshot): The earlier snapshot.
+        new (OrgSnapshot): The later snapshot.
+
+    Returns:
+        Set[int]: Their internal ids.
+    """
+    changed = {node_id for node_id in old.nodes if node_id not in new.nodes}
+    for node_id, node in new.nodes.items():
+        previous = old.nodes.get(node_id)
+        if previous is None or previous.manager_id != node.manager_id:
+            changed.add(node_id)
+    return changed
+
+
+def affected_nodes(old: OrgSnapshot, new: OrgSnapshot, changed_ids: Iterable[int]) -> Set[int]:
+    """
+    Widen the changed people to everyone whose manager changed between two snapshots.
+
+    The change feed only reports the rows that were written, but removing a manager also detaches
+    their reports through ON DELETE SET NULL.
+
+    Args:
+        old (OrgSnapshot): The earlier snapshot.
+        new (OrgSnapshot): The later snapshot.
+        changed_ids (Iterable[int]): Internal ids reported as changed.
+
+    Returns:
+        Set[int]: The changed ids and the reports of every removed manager.
+    """
+    affected = set(changed_ids)
+    for node_id in list(affected):
+        if node_id in old.nodes and node_id not in new.nodes:
+            affected.update(old.children.get(node_id, ()))
+    return affected
+
+
+def load_snapshot(session: Session) -> OrgSnapshot:
+    """
+    Read the whole organization from the database.
+
+    The org version is read before the users, so a concurrent commit can only make the
+    snapshot newer than its label, never older. The notification for that commit then
+    triggers another reload.
+
+    Args:
+        session (Session): The session used for reading.
+
+    Returns:
+        OrgSnapshot: The freshly loaded snapshot.
+    """
+    state = session.execute(select(OrgState.version, OrgState.changed_at).where(OrgState.id == 1)).first()
+    version, changed_at = state if state is not None else (0, datetime.utcnow())
+    rows = session.execute(
+        select(
+            User.id,
+            User.public_id,
+            User.username,
+            User.email,
+            User.role,
+            User.employee_id,
+            User.manager_id,
+        )
+    )
+    return OrgSnapshot(version, changed_at, (OrgNode(*row) for row in rows))
+
+
+class SnapshotCache:
+    """
+    Per-worker holder of the current org snapshot.
+
+    The change feed calls `invalidate` with every version it hears about; readers calling
+    `get` reload the snapshot once it falls behind that version or exceeds
+    `ORG_SNAPSHOT_MAX_AGE` seconds.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: Optional[OrgSnapshot] = None
+        self._known_version = -1
+
+    def get(self) -> OrgSnapshot:
+        """
+        Return the current snapshot, reloading it if it is stale.
+
+        Returns:
+            OrgSnapshot: The current snapshot.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and not self._is_stale(snapshot):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or self._is_stale(snapshot):
+                snapshot = load_snapshot(db.session)
+                self._snapshot = snapshot
+        return snapshot
+
+    def peek(self) -> Optional[OrgSnapshot]:
+        """Return the loaded snapshot without checking whether it is stale."""
+        return self._snapshot
+
+    def invalidate(self, version: Optional[int] = None) -> None:
+        """
+        Mark the snapshot as outdated.
+
+        Args:
+            version (Optional[int]): The newest known org version. If omitted the snapshot
+                is dropped unconditionally, e.g. after notifications may have been missed.
+        """
+        if version is None:
+            self._snapshot = None
+        else:
+            self._known_version = max(self._known_version, version)
+
+    def _is_stale(self, snapshot: OrgSnapshot) -> bool:
+        if snapshot.version < self._known_version:
+            return True
+        max_age = current_app.config.get("ORG_SNAPSHOT_MAX_AGE")
+        return max_age is not None and time.monotonic() - snapshot.loaded_at > max_age
+
+
+snapshots = SnapshotCache()
+
+
+def get_snapshot() -> OrgSnapshot:
+    """
+    Return the current org snapshot of this worker.
+
+    Returns:
+        OrgSnapshot: The current snapshot.
+    """
+    return snapshots.get()
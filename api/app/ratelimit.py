@@ -0,0 +1,299 @@
+"""
+Module containing rate limiting and load shedding for the API application.
+
+Two mechanisms keep expensive endpoints (bcrypt logins, exports) from occupying every
+worker thread:
+
+- Token buckets limit how often a client, and all clients together, may call an endpoint.
+  Buckets live in Redis so the limits hold across workers and containers; while Redis is
+  unreachable every worker falls back to its own in-process buckets.
+- Concurrency caps limit how many requests of a route a worker serves at the same time,
+  so the remaining threads stay free for cheap requests such as `/health`.
+
+Requests over a limit are rejected with 429 (rate) or 503 (concurrency) and a
+`Retry-After` header before the view runs, i.e. before any database or hashing work.
+
+Usage:
+@users_bp.route("/login", methods=["POST"])
+@limiter.limit(per_client=Limit(rate=5 / 60, burst=10), concurrency=4)
+def login():
+    ...
+"""
+
+import logging
+import math
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from flask import Flask, current_app, request
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+# Refills and consumes several buckets atomically; nothing is consumed unless every
+# bucket has enough tokens. Returns 1 or 0 and the seconds until the request would pass.
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'at')
+    local available = tonumber(state[1]) or burst
+    local at = tonumber(state[2]) or now
+    available = math.min(burst, available + math.max(0, now - at) * rate)
+    tokens[i] = available
+    if available < 1 then
+        wait = math.max(wait, (1 - available) / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    if wait == 0 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call('HSET', key, 'tokens', tokens[i], 'at', now)
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+if wait == 0 then
+    return {1, '0'}
+end
+return {0, tostring(wait)}
+"""
+
+
+class Limit(NamedTuple):
+    """A token bucket refilled with `rate` tokens per second, holding at most `burst` tokens."""
+
+    rate: float
+    burst: int
+
+
+Bucket = Tuple[str, Limit]
+
+
+class LocalBuckets:
+    """In-process token buckets, used without Redis or while it is unreachable."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def consume(self, buckets: Sequence[Bucket]) -> float:
+        """
+        Take one token from every bucket, or from none if any of them is empty.
+
+        Args:
+            buckets (Sequence[Bucket]): The bucket keys and their limits.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until they would be available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = []
+            wait = 0.0
+            for key, limit in buckets:
+                tokens, at = self._buckets.get(key, (limit.burst, now))
+                tokens = min(limit.burst, tokens + (now - at) * limit.rate)
+                available.append(tokens)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / limit.rate)
+            for tokens, (key, _) in zip(available, buckets):
+                self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+            if len(self._buckets) > 100000:
+                self._evict(now)
+        return wait
+
+    def _evict(self, now: float) -> None:
+        # Drop buckets that have been idle for a minute; a fresh bucket starts full anyway.
+        self._buckets = {key: state for key, state in self._buckets.items() if now - state[1] < 60}
+
+
+class RedisBuckets:
+    """Token buckets shared by all workers through Redis."""
+
+    def __init__(self, url: str, timeout: float, retry_interval: float) -> None:
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._retry_interval = retry_interval
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Whether Redis is believed to be reachable."""
+        return time.monotonic() >= self._down_until
+
+    def consume(self, buckets: Sequence[Bucket]) -> float:
+        """
+        Take one token from every bucket, or from none if any of them is empty.
+
+        Args:
+            buckets (Sequence[Bucket]): The bucket keys and their limits.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until they would be available.
+
+        Raises:
+            redis.RedisError: If Redis cannot be reached; it is then skipped for `retry_interval` seconds.
+        """
+        arguments: List[float] = []
+        for _, limit in buckets:
+            arguments.extend(limit)
+        try:
+            allowed, wait = self._script(keys=[KEY_PREFIX + key for key, _ in buckets], args=arguments)
+        except redis.RedisError:
+            self._down_until = time.monotonic() + self._retry_interval
+            raise
+        return 0.0 if allowed else float(wait)
+
+
+class RateLimiter:
+    """
+    Flask extension applying token buckets and concurrency caps.
+
+    Every request except the `RATELIMIT_EXEMPT` endpoints is charged to the client's
+    `RATELIMIT_DEFAULT` bucket. Views decorated with `limit` additionally have their own
+    buckets and concurrency cap.
+    """
+
+    def __init__(self) -> None:
+        self._local = LocalBuckets()
+        self._redis: Optional[RedisBuckets] = None
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._semaphores_lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the limiter with the application.
+
+        Args:
+            app (Flask): The Flask application instance.
+        """
+        url = app.config.get("RATELIMIT_STORAGE_URL")
+        if url and redis is not None:
+            self._redis = RedisBuckets(
+                url, app.config.get("RATELIMIT_STORAGE_TIMEOUT", 0.05), app.config.get("RATELIMIT_RETRY_INTERVAL", 5)
+            )
+        elif url:
+            logger.warning("The redis package is not installed; rate limits are enforced per worker")
+        app.before_request(self._check_default)
+
+    def limit(
+        self,
+        per_client: Optional[Limit] = None,
+        per_endpoint: Optional[Limit] = None,
+        concurrency: Optional[int] = None,
+    ) -> Callable[[Callable], Callable]:
+        """
+        Limit a view.
+
+        Args:
+            per_client (Optional[Limit]): Bucket of every client on this endpoint.
+            per_endpoint (Optional[Limit]): Bucket shared by all clients on this endpoint.
+            concurrency (Optional[int]): Maximum number of requests served at once by one worker.
+
+        Returns:
+            Callable[[Callable], Callable]: The decorator.
+        """
+
+        def decorator(view: Callable) -> Callable:
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not current_app.config.get("RATELIMIT_ENABLED", True):
+                    return view(*args, **kwargs)
+
+                buckets = []
+                if per_client is not None:
+                    buckets.append((f"{request.endpoint}:{client_id()}", per_client))
+                if per_endpoint is not None:
+                    buckets.append((request.endpoint, per_endpoint))
+                self.check(buckets)
+
+                if concurrency is None:
+                    return view(*args, **kwargs)
+                semaphore = self._semaphore(request.endpoint, concurrency)
+                if not semaphore.acquire(blocking=False):
+                    raise ServiceUnavailable("Too many concurrent requests, try again shortly.", retry_after=1)
+                try:
+                    response = current_app.make_response(view(*args, **kwargs))
+                except BaseException:
+                    semaphore.release()
+                    raise
+                # Streamed responses keep their slot until the body has been sent.
+                response.call_on_close(semaphore.release)
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def check(self, buckets: Sequence[Bucket]) -> None:
+        """
+        Take a token from every bucket or reject the request.
+
+        The limits are scaled by `RATELIMIT_BUCKET_SCALE`.
+
+        Args:
+            buckets (Sequence[Bucket]): The bucket keys and their limits.
+
+        Raises:
+            TooManyRequests: If any bucket is empty.
+        """
+        if not buckets:
+            return
+        scale = current_app.config.get("RATELIMIT_BUCKET_SCALE", 1)
+        if scale != 1:
+            buckets = [(key, Limit(limit.rate * scale, max(1, round(limit.burst * scale)))) for key, limit in buckets]
+        wait = None
+        if self._redis is not None and self._redis.available:
+            try:
+                wait = self._redis.consume(buckets)
+            except redis.RedisError:
+                logger.warning("Redis is unreachable, falling back to per-worker rate limits", exc_info=True)
+        if wait is None:
+            wait = self._local.consume(buckets)
+        if wait > 0:
+            raise TooManyRequests("Rate limit exceeded.", retry_after=max(1, math.ceil(wait)))
+
+    def _check_default(self) -> None:
+        config = current_app.config
+        default = config.get("RATELIMIT_DEFAULT")
+        if not config.get("RATELIMIT_ENABLED", True) or default is None:
+            return
+        if request.endpoint in config.get("RATELIMIT_EXEMPT", ()):
+            return
+        self.check([(f"default:{client_id()}", Limit(*default))])
+
+    def _semaphore(self, endpoint: str, concurrency: int) -> threading.BoundedSemaphore:
+        semaphore = self._semaphores.get(endpoint)
+        if semaphore is None:
+            with self._semaphores_lock:
+                semaphore = self._semaphores.setdefault(endpoint, threading.BoundedSemaphore(concurrency))
+        return semaphore
+
+
+def client_id() -> str:
+    """
+    Identify the client of the current request.
+
+    nginx passes the peer address in `X-Real-IP`; the API is not reachable other than
+    through it.
+
+    Returns:
+        str: The client address.
+    """
+    return request.headers.get("X-Real-IP") or request.remote_addr or "unknown"
+
+
+limiter = RateLimiter()
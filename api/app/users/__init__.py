@@ -1,3 +1,6 @@
 """Package for user-related functionality."""
 # noqa: WPS412
+from app.users.auth import check_role, current_user, issue_token, read_token  # noqa: F401
+from app.users.loader import get_user_loaders  # noqa: F401
 from app.users.models import User  # noqa: F401
+from app.users.routes import users_bp  # noqa: F401
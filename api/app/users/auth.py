@@ -0,0 +1,92 @@
+"""
+Module containing token authentication of users.
+
+`POST /users/login` issues a bearer token signed with `SECRET_KEY`; it expires after
+`JWT_ACCESS_TOKEN_EXPIRES`. Views that change data require a token of a user with one of
+the allowed roles. The user is loaded on every request, so a changed role or a removed
+user takes effect immediately.
+
+Usage:
+user = check_role(Role.admin, Role.hr)  # 401 without a valid token, 403 for other roles
+"""
+
+import uuid
+from typing import Optional
+
+from flask import abort, current_app, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import select
+
+from app.extensions import db
+from app.users.models import Role, User
+
+TOKEN_SALT = "access-token"
+
+
+def _serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=TOKEN_SALT)
+
+
+def issue_token(user: User) -> str:
+    """
+    Issue an access token for a user.
+
+    Args:
+        user (User): The authenticated user.
+
+    Returns:
+        str: The signed token.
+    """
+    return _serializer().dumps({"id": str(user.public_id)})
+
+
+def read_token(token: str) -> Optional[uuid.UUID]:
+    """
+    Verify an access token.
+
+    Args:
+        token (str): The token sent by the client.
+
+    Returns:
+        Optional[uuid.UUID]: Public id of the token's user, or None if the token is forged,
+            tampered with or expired.
+    """
+    max_age = current_app.config["JWT_ACCESS_TOKEN_EXPIRES"].total_seconds()
+    try:
+        return uuid.UUID(_serializer().loads(token, max_age=max_age)["id"])
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def current_user() -> Optional[User]:
+    """
+    Return the user of the bearer token sent with the current request.
+
+    Returns:
+        Optional[User]: The user, or None if no valid token was sent.
+    """
+    if "current_user" not in g:
+        g.current_user = None
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        public_id = read_token(token) if scheme.lower() == "bearer" and token else None
+        if public_id is not None:
+            g.current_user = db.session.execute(select(User).where(User.public_id == public_id)).scalar_one_or_none()
+    return g.current_user
+
+
+def check_role(*roles: Role) -> User:
+    """
+    Require a signed-in user with one of the given roles.
+
+    Args:
+        roles (Role): The allowed roles.
+
+    Returns:
+        User: The signed-in user.
+    """
+    user = current_user()
+    if user is None:
+        abort(401, description="A valid access token is required.")
+    if user.role not in roles:
+        abort(403, description="Your role is not allowed to do this.")
+    return user
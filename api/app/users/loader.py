@@ -0,0 +1,114 @@
+"""
+Module containing the per-request loaders of users.
+
+Users can be looked up by public id, email or employee id. Every key type has its own
+`DataLoader`, which resolves all keys requested during a request with a single
+`= ANY(:keys)` query: one bound array parameter instead of one placeholder per key, so
+the statement text, and PostgreSQL's cached plan, stay the same for any number of keys.
+"""
+
+import uuid
+from typing import Any, Dict, Iterable, List
+
+from flask import g
+from sqlalchemy import Integer, String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import aliased
+
+from app.dataloader import DataLoader
+from app.extensions import db
+from app.users.models import User
+
+MAX_BATCH_SIZE = 10000
+# Returned for a key matching several users; only employee ids are not unique.
+AMBIGUOUS = {"error": "Several people have this key."}
+
+
+def fetch_users(column: Any, element_type: Any, keys: List[Any]) -> Dict[Any, dict]:
+    """
+    Fetch users by the values of one column.
+
+    Args:
+        column (Any): The `User` column to match, e.g. `User.email`.
+        element_type (Any): The SQL type of the column, for the array parameter.
+        keys (List[Any]): The values to look up.
+
+    Returns:
+        Dict[Any, dict]: The serialized users keyed by the matched value, or `AMBIGUOUS`
+            for values matching several users.
+    """
+    manager = aliased(User)
+    rows = db.session.execute(
+        select(
+            column.label("key"),
+            User.public_id,
+            User.username,
+            User.email,
+            User.role,
+            User.employee_id,
+            manager.public_id.label("manager"),
+        )
+        .outerjoin(manager, manager.id == User.manager_id)
+        .where(column == any_(bindparam("keys", keys, type_=ARRAY(element_type))))
+    )
+    return users_by_key(rows)
+
+
+def users_by_key(rows: Iterable[Any]) -> Dict[Any, dict]:
+    """
+    Serialize fetched users, keyed by the value they were matched by.
+
+    Args:
+        rows (Iterable[Any]): Rows with the matched `key` and the user's fields.
+
+    Returns:
+        Dict[Any, dict]: The serialized users, or `AMBIGUOUS` where several share a key.
+    """
+    users: Dict[Any, dict] = {}
+    for row in rows:
+        if row.key in users:
+            users[row.key] = AMBIGUOUS
+            continue
+        users[row.key] = {
+            "id": row.public_id,
+            "username": row.username,
+            "email": row.email,
+            "role": row.role.value,
+            "employee_id": row.employee_id,
+            "manager": row.manager,
+        }
+    return users
+
+
+class UserLoaders:
+    """
+    The user loaders of one request.
+
+    Attributes:
+        by_public_id (DataLoader[uuid.UUID, dict]): Users by public id.
+        by_email (DataLoader[str, dict]): Users by email.
+        by_employee_id (DataLoader[int, dict]): Users by employee id.
+    """
+
+    def __init__(self) -> None:
+        self.by_public_id: DataLoader[uuid.UUID, dict] = DataLoader(
+            lambda keys: fetch_users(User.public_id, UUID(as_uuid=True), keys), MAX_BATCH_SIZE
+        )
+        self.by_email: DataLoader[str, dict] = DataLoader(
+            lambda keys: fetch_users(User.email, String, keys), MAX_BATCH_SIZE
+        )
+        self.by_employee_id: DataLoader[int, dict] = DataLoader(
+            lambda keys: fetch_users(User.employee_id, Integer, keys), MAX_BATCH_SIZE
+        )
+
+
+def get_user_loaders() -> UserLoaders:
+    """
+    Return the user loaders of the current request, creating them on first use.
+
+    Returns:
+        UserLoaders: The loaders, cached on `flask.g`.
+    """
+    if "user_loaders" not in g:
+        g.user_loaders = UserLoaders()
+    return g.user_loaders
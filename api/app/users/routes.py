@@ -0,0 +1,143 @@
+"""Routes of the users API."""
+
+import secrets
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Optional
+
+from flask import Blueprint, abort, jsonify, request
+from sqlalchemy import select
+
+from app.extensions import bcrypt, db
+from app.ratelimit import Limit, limiter
+from app.users.auth import check_role, issue_token
+from app.users.loader import get_user_loaders
+from app.users.models import Role, User
+
+users_bp = Blueprint("users", __name__, url_prefix="/users")
+
+# Enough for a page of the UI; resolving is not meant for bulk lookups.
+RESOLVE_MAX_KEYS = 200
+# Signed-in users other than guests may look people up.
+RESOLVE_ROLES = (Role.admin, Role.hr, Role.employee)
+MAX_EMPLOYEE_ID = 2**31 - 1  # employee_id is a PostgreSQL integer
+MAX_EMAIL_LENGTH = User.__table__.c.email.type.length
+
+
+@lru_cache(maxsize=1)
+def dummy_password_hash() -> str:
+    """
+    Return a hash no password matches, made with the configured bcrypt cost.
+
+    Checking it for unknown emails makes a failed login take as long as for a known one,
+    so response times do not reveal which emails have accounts.
+
+    Returns:
+        str: The hash, computed once per worker.
+    """
+    return bcrypt.generate_password_hash(secrets.token_urlsafe(32)).decode("utf-8")
+
+
+def parse_public_id(value: Any) -> Optional[uuid.UUID]:
+    """Parse a public id, returning None if it is malformed."""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def parse_employee_id(value: Any) -> Optional[int]:
+    """Parse an employee id given as a number or a string of ASCII digits, returning None if it is malformed."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.isascii() and value.isdigit() and len(value) <= len(str(MAX_EMPLOYEE_ID)):
+        value = int(value)
+    if isinstance(value, int) and 0 <= value <= MAX_EMPLOYEE_ID:
+        return value
+    return None
+
+
+def parse_email(value: Any) -> Optional[str]:
+    """Accept an email as is if it could be stored, returning None if it is malformed."""
+    if isinstance(value, str) and 0 < len(value) <= MAX_EMAIL_LENGTH and "@" in value and "\x00" not in value:
+        return value
+    return None
+
+
+RESOLVE_KEY_TYPES = {
+    "public_ids": ("by_public_id", parse_public_id),
+    "emails": ("by_email", parse_email),
+    "employee_ids": ("by_employee_id", parse_employee_id),
+}
+
+
+@users_bp.route("/login", methods=["POST"])
+@limiter.limit(per_client=Limit(rate=1, burst=10), per_endpoint=Limit(rate=50, burst=100), concurrency=4)
+def login():
+    """
+    Verify a user's credentials and issue an access token.
+
+    Every attempt costs a bcrypt hash, so attempts are limited per client and overall,
+    and each worker runs at most four at a time.
+
+    JSON Args:
+        email (str): The user's email.
+        password (str): The user's password.
+    """
+    credentials = request.get_json(silent=True) or {}
+    email, password = credentials.get("email"), credentials.get("password")
+    if not isinstance(email, str) or not isinstance(password, str):
+        abort(400, description="email and password are required.")
+
+    user = db.session.execute(select(User).where(User.email == email)).scalar_one_or_none()
+    if user is None:
+        bcrypt.check_password_hash(dummy_password_hash(), password)
+        abort(401, description="Invalid credentials.")
+    if not user.verify_password(password):
+        abort(401, description="Invalid credentials.")
+
+    user.last_login = datetime.utcnow()
+    db.session.commit()
+    return jsonify({"id": user.public_id, "role": user.role.value, "token": issue_token(user)})
+
+
+@users_bp.route("/resolve", methods=["POST"])
+@limiter.limit(per_client=Limit(rate=5, burst=20))
+def resolve():
+    """
+    Resolve many people at once.
+
+    Each key type is resolved with a single query, however many keys are sent. The
+    response maps every key, as sent, to the person or to null if there is none. A key
+    shared by several people, which employee ids can be, maps to an `error` instead.
+    Requires an access token of a user other than a guest.
+
+    JSON Args:
+        public_ids (List[str]): Public ids to resolve.
+        emails (List[str]): Emails to resolve.
+        employee_ids (List[int]): Employee ids to resolve.
+    """
+    check_role(*RESOLVE_ROLES)
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not any(name in body for name in RESOLVE_KEY_TYPES):
+        abort(400, description=f"Send at least one of {', '.join(RESOLVE_KEY_TYPES)}.")
+    if any(not isinstance(body.get(name, []), list) for name in RESOLVE_KEY_TYPES):
+        abort(400, description="Keys must be sent as lists.")
+    if sum(len(body.get(name, [])) for name in RESOLVE_KEY_TYPES) > RESOLVE_MAX_KEYS:
+        abort(400, description=f"At most {RESOLVE_MAX_KEYS} keys can be resolved at once.")
+
+    loaders = get_user_loaders()
+    # Queue the keys of every type before reading any of them: one query per type.
+    pending = {}
+    for name, (loader_name, parse) in RESOLVE_KEY_TYPES.items():
+        if name in body:
+            loader = getattr(loaders, loader_name)
+            keys = {str(raw): parse(raw) for raw in body[name]}
+            pending[name] = {raw: loader.load(key) if key is not None else None for raw, key in keys.items()}
+    return jsonify(
+        {
+            name: {raw: deferred.get() if deferred is not None else None for raw, deferred in keys.items()}
+            for name, keys in pending.items()
+        }
+    )
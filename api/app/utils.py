@@ -8,7 +8,11 @@ This module contains various utility functions and helper methods used across th
 
 from flask import Flask
 
-from app.extensions import bcrypt, db
+from app.extensions import bcrypt, compress, db
+from app.jobs import jobs, jobs_bp
+from app.org import changefeed, org_bp
+from app.ratelimit import limiter
+from app.users import users_bp
 
 
 def register_flask_extensions(app: Flask) -> None:
@@ -22,3 +26,21 @@ def register_flask_extensions(app: Flask) -> None:
     """
     db.init_app(app)
     bcrypt.init_app(app)
+    compress.init_app(app)
+    changefeed.init_app(app)
+    limiter.init_app(app)
+    jobs.init_app(app)
+
+
+def register_blueprints(app: Flask) -> None:
+    """Register the API blueprints in the Flask object passed as parameter.
+
+    Args:
+        app (Flask): The Flask app object.
+
+    Returns:
+     None
+    """
+    app.register_blueprint(org_bp)
+    app.register_blueprint(users_bp)
+    app.register_blueprint(jobs_bp)
@@ -0,0 +1,57 @@
+"""
+Migration runner for the API application.
+
+Upgrades the database to the latest revision. Concurrent runs are serialized by an
+advisory lock in migrations/env.py, so every replica may call this on start-up: one
+migrates, the others wait and find the database at head. A migration that gives up
+on a lock (lock_timeout) is retried with backoff instead of failing the deploy. The
+retry reruns the revision from the start, so revisions that commit part-way (see
+migrations/helpers.py) must skip the steps an earlier attempt already committed.
+
+Usage:
+python migrate.py [--revision head] [--retries 5]
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.exc import OperationalError
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCK_NOT_AVAILABLE = "55P03"
+
+logger = logging.getLogger("alembic")
+
+
+def upgrade(revision: str = "head", retries: int = 5) -> None:
+    """
+    Upgrade the database, retrying when a migration times out waiting for a lock.
+
+    Args:
+        revision (str): The target revision.
+        retries (int): How many times to retry after a lock timeout.
+    """
+    alembic_config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    alembic_config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    for attempt in range(retries + 1):
+        try:
+            command.upgrade(alembic_config, revision)
+            return
+        except OperationalError as error:
+            if getattr(error.orig, "pgcode", None) != LOCK_NOT_AVAILABLE or attempt == retries:
+                raise
+            delay = 2**attempt
+            logger.warning("Migration timed out waiting for a lock, retrying in %ss", delay)
+            time.sleep(delay)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database schema.")
+    parser.add_argument("--revision", default="head")
+    parser.add_argument("--retries", type=int, default=5)
+    args = parser.parse_args()
+    upgrade(args.revision, args.retries)
@@ -2,7 +2,7 @@ import os
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, pool, text
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -28,6 +28,7 @@ from app.database import Base  # noqa
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.users import User  # noqa
+from app.org import OrgSnapshotRecord, OrgState, UserVersion  # noqa
 
 target_metadata = Base.metadata
 
@@ -36,6 +37,11 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Advisory lock key serializing migration runs across processes.
+MIGRATION_LOCK_ID = 0x616C656D
+LOCK_TIMEOUT = os.environ.get("MIGRATION_LOCK_TIMEOUT", "5s")
+STATEMENT_TIMEOUT = os.environ.get("MIGRATION_STATEMENT_TIMEOUT", "60s")
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -67,6 +73,13 @@ def run_migrations_online() -> None:
     In this scenario we need to create an Engine
     and associate a connection with the context.
 
+    A session-level advisory lock makes concurrent runs (e.g. every replica
+    starting at once) wait for each other, so only one of them migrates and
+    the others find the database at head. Once the lock is held, short lock
+    and statement timeouts make DDL fail fast instead of queueing the API's
+    queries behind it; helpers in migrations/helpers.py lift the statement
+    timeout for operations that are known to be long but non-blocking.
+
     """
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
@@ -75,14 +88,25 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata,
-            compare_server_default=True,
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+        connection.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+        connection.execute(text(f"SET statement_timeout = '{STATEMENT_TIMEOUT}'"))
+        connection.commit()
+
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                compare_server_default=True,
+                transaction_per_migration=True,
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            connection.rollback()
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+            connection.commit()
 
 
 if context.is_offline_mode():
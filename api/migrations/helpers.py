@@ -0,0 +1,270 @@
+"""
+Helpers for migrations that must not stall the API on large tables.
+
+`env.py` runs every migration with short lock and statement timeouts, so a DDL statement
+waiting behind long transactions fails fast instead of queueing all writers behind it.
+The helpers below cover the operations that would otherwise hold strong locks for the
+whole duration of a table scan:
+
+- `create_index_concurrently` / `drop_index_concurrently` build or drop indexes without
+  blocking writes; they run outside the migration transaction.
+- `add_foreign_key_online` adds a foreign key as NOT VALID and validates it separately,
+  which only takes a lock that does not block reads or writes.
+- `backfill` updates a table in small, throttled batches, each in its own transaction,
+  and reports progress; `run_in_batches` does the same for any statement.
+
+Each of these commits the migration's work so far. When a later step times out, `migrate.py`
+retries the whole revision, so the steps before a commit must be safe to run again:
+guard them with `table_exists` / `column_exists`, or use the helpers above, which skip
+work that is already done.
+
+Usage:
+from migrations.helpers import backfill, create_index_concurrently
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+from alembic import context, op
+from sqlalchemy import text
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _index_state(index_name: str) -> Optional[bool]:
+    """Return True for a valid index, False for an invalid one and None if it does not exist."""
+    return (
+        op.get_bind()
+        .execute(
+            text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+            ),
+            {"name": index_name},
+        )
+        .scalar()
+    )
+
+
+def _catalog_has(query: str, **params: str) -> bool:
+    """Run an existence query against the catalog; offline, nothing exists yet."""
+    if context.is_offline_mode():
+        return False
+    return op.get_bind().execute(text(query), params).scalar() is not None
+
+
+def table_exists(table_name: str) -> bool:
+    """Return whether a table exists (always False offline)."""
+    return _catalog_has("SELECT to_regclass(:name)", name=table_name)
+
+
+def column_exists(table_name: str, column_name: str) -> bool:
+    """Return whether a table has a column (always False offline)."""
+    return _catalog_has(
+        "SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass(:table) AND attname = :column AND NOT attisdropped",
+        table=table_name,
+        column=column_name,
+    )
+
+
+def constraint_exists(table_name: str, constraint_name: str) -> bool:
+    """Return whether a table has a constraint (always False offline)."""
+    return _catalog_has(
+        "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(:table) AND conname = :name",
+        table=table_name,
+        name=constraint_name,
+    )
+
+
+@contextmanager
+def _without_statement_timeout() -> Iterator[None]:
+    """Lift the statement timeout for a long, non-blocking operation and restore the previous one."""
+    previous = None if context.is_offline_mode() else op.get_bind().execute(text("SHOW statement_timeout")).scalar()
+    op.execute("SET statement_timeout = 0")
+    try:
+        yield
+    finally:
+        if previous is None:
+            op.execute("RESET statement_timeout")
+        else:
+            op.execute(text("SELECT set_config('statement_timeout', :value, false)").bindparams(value=previous))
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    **kw,
+) -> None:
+    """
+    Create an index with CREATE INDEX CONCURRENTLY.
+
+    A build that failed earlier leaves an INVALID index behind; it is dropped and rebuilt,
+    so the migration can simply be re-run.
+
+    Args:
+        index_name (str): The index name.
+        table_name (str): The table name.
+        columns (Sequence[str]): The indexed columns.
+        unique (bool): Create a unique index.
+        kw: Further arguments for `op.create_index`, e.g. `postgresql_where`.
+    """
+    with context.get_context().autocommit_block():
+        if not context.is_offline_mode():
+            state = _index_state(index_name)
+            if state:
+                logger.info("Index %s already exists, skipping", index_name)
+                return
+            if state is False:
+                logger.info("Dropping invalid index %s left by an earlier build", index_name)
+                op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+        # The build scans the whole table; it does not block writers, so let it take its time.
+        with _without_statement_timeout():
+            op.create_index(index_name, table_name, columns, unique=unique, postgresql_concurrently=True, **kw)
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """
+    Drop an index with DROP INDEX CONCURRENTLY.
+
+    Args:
+        index_name (str): The index name.
+        table_name (str): The table name.
+    """
+    with context.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def add_foreign_key_online(
+    constraint_name: str,
+    source_table: str,
+    referent_table: str,
+    local_cols: Sequence[str],
+    remote_cols: Sequence[str],
+    ondelete: Optional[str] = None,
+) -> None:
+    """
+    Add a foreign key without blocking writes for the duration of its validation.
+
+    The constraint is committed before it is validated; when the migration is retried
+    after the validation timed out, the existing constraint is validated again.
+
+    Args:
+        constraint_name (str): The constraint name.
+        source_table (str): The referencing table.
+        referent_table (str): The referenced table.
+        local_cols (Sequence[str]): The referencing columns.
+        remote_cols (Sequence[str]): The referenced columns.
+        ondelete (Optional[str]): The ON DELETE action.
+    """
+    on_delete = f" ON DELETE {ondelete}" if ondelete else ""
+    if constraint_exists(source_table, constraint_name):
+        logger.info("Constraint %s already exists, validating it", constraint_name)
+    else:
+        op.execute(
+            f"ALTER TABLE {source_table} ADD CONSTRAINT {constraint_name} "
+            f"FOREIGN KEY ({', '.join(local_cols)}) REFERENCES {referent_table} ({', '.join(remote_cols)})"
+            f"{on_delete} NOT VALID"
+        )
+    with context.get_context().autocommit_block(), _without_statement_timeout():
+        op.execute(f"ALTER TABLE {source_table} VALIDATE CONSTRAINT {constraint_name}")
+
+
+def backfill(
+    table_name: str,
+    set_clause: str,
+    where: str = "TRUE",
+    key: str = "id",
+    batch_size: int = 5000,
+    pause: float = 0.05,
+) -> int:
+    """
+    Update a table in key-ordered batches, each committed on its own.
+
+    Batches walk the key range, so every batch is a short index range scan and row locks
+    are held for one batch only. `pause` seconds between batches leave room for the API.
+
+    Args:
+        table_name (str): The table to update.
+        set_clause (str): The SQL SET clause, e.g. `"manager_id = NULL"`.
+        where (str): SQL condition selecting the rows that still need the update.
+        key (str): A unique, indexed integer column to walk.
+        batch_size (int): Number of keys per batch.
+        pause (float): Seconds to sleep between batches.
+
+    Returns:
+        int: The number of updated rows.
+    """
+    if context.is_offline_mode():
+        op.execute(f"UPDATE {table_name} SET {set_clause} WHERE {where}")
+        return 0
+    return run_in_batches(
+        table_name,
+        f"UPDATE {table_name} SET {set_clause} WHERE {key} > :last AND {key} <= :upper AND ({where})",
+        key,
+        batch_size,
+        pause,
+    )
+
+
+def run_in_batches(
+    table_name: str,
+    statement: str,
+    key: str = "id",
+    batch_size: int = 5000,
+    pause: float = 0.05,
+) -> int:
+    """
+    Run a statement once per key-ordered batch of a table, each batch committed on its own.
+
+    This is the loop behind `backfill`, for statements other than a plain UPDATE, e.g.
+    copying rows into a new table with INSERT ... SELECT.
+
+    Args:
+        table_name (str): The table whose key range is walked.
+        statement (str): SQL restricted to the batch by the `:last` (exclusive) and `:upper`
+            (inclusive) key bounds.
+        key (str): A unique, indexed integer column to walk.
+        batch_size (int): Number of keys per batch.
+        pause (float): Seconds to sleep between batches.
+
+    Returns:
+        int: The number of affected rows.
+    """
+    if context.is_offline_mode():
+        op.execute(text(statement).bindparams(last=-(2**63), upper=2**63 - 1))
+        return 0
+
+    connection = op.get_bind()
+    affected = 0
+    with context.get_context().autocommit_block():
+        lowest, highest = connection.execute(text(f"SELECT min({key}), max({key}) FROM {table_name}")).one()
+        if lowest is None:
+            return 0
+        last = lowest - 1
+        started = time.monotonic()
+        while last < highest:
+            upper = connection.execute(
+                text(
+                    f"SELECT max({key}) FROM (SELECT {key} FROM {table_name} WHERE {key} > :last "
+                    f"ORDER BY {key} LIMIT :limit) AS batch"
+                ),
+                {"last": last, "limit": batch_size},
+            ).scalar()
+            if upper is None:
+                break
+            affected += connection.execute(text(statement), {"last": last, "upper": upper}).rowcount
+            last = upper
+            progress = (last - lowest + 1) / (highest - lowest + 1)
+            logger.info(
+                "Batches over %s: %.1f%% of key range, %d rows affected, %.0fs elapsed",
+                table_name,
+                progress * 100,
+                affected,
+                time.monotonic() - started,
+            )
+            time.sleep(pause)
+    return affected
@@ -0,0 +1,44 @@
+"""Org change feed
+
+Revision ID: 3f1c9a7d52e4
+Revises: ec8ee73c3c46
+Create Date: 2026-10-19 10:10:12.418305
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from migrations.helpers import add_foreign_key_online, column_exists, create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = "3f1c9a7d52e4"
+down_revision = "ec8ee73c3c46"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The foreign key and the index commit what came before them; a retry after either timed
+    # out must not add the column again.
+    if not column_exists("users", "manager_id"):
+        op.add_column("users", sa.Column("manager_id", sa.Integer(), nullable=True))
+    add_foreign_key_online(
+        "fk__users__manager_id__users", "users", "users", ["manager_id"], ["id"], ondelete="SET NULL"
+    )
+    create_index_concurrently("ix__users__manager_id", "users", ["manager_id"])
+
+    org_state = op.create_table(
+        "org_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk__org_state")),
+    )
+    # The change feed increments this single row in every transaction changing the org.
+    op.execute(org_state.insert().values(id=1, version=0, changed_at=sa.func.timezone("utc", sa.func.now())))
+
+
+def downgrade():
+    op.drop_table("org_state")
+    drop_index_concurrently("ix__users__manager_id", "users")
+    op.drop_constraint(op.f("fk__users__manager_id__users"), "users", type_="foreignkey")
+    op.drop_column("users", "manager_id")
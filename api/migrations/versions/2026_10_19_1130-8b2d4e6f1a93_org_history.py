@@ -0,0 +1,124 @@
+"""Org history
+
+Revision ID: 8b2d4e6f1a93
+Revises: 3f1c9a7d52e4
+Create Date: 2026-10-19 11:30:41.902114
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from migrations.helpers import run_in_batches, table_exists
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "8b2d4e6f1a93"
+down_revision = "3f1c9a7d52e4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Everything up to the backfill commits as a whole when the backfill starts. A retry after
+    # a batch timed out finds it in place and only continues the backfill.
+    if not table_exists("user_versions"):
+        create_history_schema()
+
+    # History starts now: existing users are recorded as valid from the upgrade. The trigger
+    # is committed first, so the copy runs in short batches without holding a lock on users;
+    # a user changed meanwhile, or copied by an earlier attempt, already has a current
+    # version and is skipped.
+    run_in_batches(
+        "users",
+        """
+        INSERT INTO user_versions (user_id, public_id, username, email, role, employee_id, manager_id, valid_from)
+        SELECT id, public_id, username, email, role, employee_id, manager_id, timezone('utc', clock_timestamp())
+        FROM users
+        WHERE id > :last AND id <= :upper
+        ON CONFLICT (user_id) WHERE valid_to IS NULL DO NOTHING
+        """,
+    )
+
+
+def create_history_schema():
+    op.create_table(
+        "user_versions",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("public_id", sa.UUID(), nullable=False),
+        sa.Column("username", sa.String(length=120), nullable=True),
+        sa.Column("email", sa.String(length=120), nullable=False),
+        sa.Column("role", postgresql.ENUM(name="role", create_type=False), nullable=False),
+        sa.Column("employee_id", sa.Integer(), nullable=True),
+        sa.Column("manager_id", sa.Integer(), nullable=True),
+        sa.Column("valid_from", sa.DateTime(), nullable=False),
+        sa.Column("valid_to", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk__user_versions")),
+    )
+    op.create_index(op.f("ix__user_versions__valid_from"), "user_versions", ["valid_from"], unique=False)
+    op.create_index(op.f("ix__user_versions__valid_to"), "user_versions", ["valid_to"], unique=False)
+    op.create_index(
+        "ix__user_versions__user_id_current",
+        "user_versions",
+        ["user_id"],
+        unique=True,
+        postgresql_where=sa.text("valid_to IS NULL"),
+    )
+
+    op.create_table(
+        "org_snapshots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("taken_at", sa.DateTime(), nullable=False),
+        sa.Column("replay_from", sa.DateTime(), nullable=False),
+        sa.Column("node_count", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk__org_snapshots")),
+    )
+    op.create_index(op.f("ix__org_snapshots__taken_at"), "org_snapshots", ["taken_at"], unique=False)
+
+    # clock_timestamp() rather than now(): a version gets the time its statement ran, never
+    # earlier than the start of its transaction, which full snapshots rely on.
+    op.execute(
+        """
+        CREATE FUNCTION record_user_version() RETURNS trigger AS $$
+        DECLARE
+            ts timestamp := timezone('utc', clock_timestamp());
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND (OLD.public_id, OLD.username, OLD.email, OLD.role, OLD.employee_id, OLD.manager_id)
+                   IS NOT DISTINCT FROM
+                   (NEW.public_id, NEW.username, NEW.email, NEW.role, NEW.employee_id, NEW.manager_id) THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE user_versions SET valid_to = ts WHERE user_id = OLD.id AND valid_to IS NULL;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO user_versions
+                    (user_id, public_id, username, email, role, employee_id, manager_id, valid_from)
+                VALUES
+                    (NEW.id, NEW.public_id, NEW.username, NEW.email, NEW.role, NEW.employee_id, NEW.manager_id, ts);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER users_history
+        AFTER INSERT OR DELETE OR UPDATE OF public_id, username, email, role, employee_id, manager_id ON users
+        FOR EACH ROW EXECUTE FUNCTION record_user_version()
+        """
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER users_history ON users")
+    op.execute("DROP FUNCTION record_user_version()")
+    op.drop_index(op.f("ix__org_snapshots__taken_at"), table_name="org_snapshots")
+    op.drop_table("org_snapshots")
+    op.drop_index("ix__user_versions__user_id_current", table_name="user_versions")
+    op.drop_index(op.f("ix__user_versions__valid_to"), table_name="user_versions")
+    op.drop_index(op.f("ix__user_versions__valid_from"), table_name="user_versions")
+    op.drop_table("user_versions")
@@ -0,0 +1,29 @@
+"""
+Job worker for the API application.
+
+Executes background jobs (imports, exports, layout computation) taken from the Redis
+queue, separately from the gunicorn workers serving requests. Run as many workers as
+needed; SIGTERM lets running jobs finish before the process exits.
+
+Usage:
+python worker.py [--concurrency 2]
+"""
+
+import argparse
+import logging
+import signal
+
+from app import create_app
+from app.jobs import jobs
+from app.jobs.worker import Worker
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs.")
+    parser.add_argument("--concurrency", type=int, default=2, help="number of jobs run at the same time")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = Worker(create_app(), jobs, args.concurrency)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run()
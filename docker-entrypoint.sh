@@ -4,15 +4,15 @@ set -e
 # Run PostgreSQL (standard entrypoint script)
 #.docker-entrypoint.sh "$@"
 
-# Check for the presence of Alembic and the configuration file
-if command -v alembic &> /dev/null && [ -f "/migrations/alembic.ini" ]; then
-  # Check if the database requires migrations
-  if alembic -c /migrations/alembic.ini current; then
-    # Apply migrations
-    alembic -c /migrations/alembic.ini upgrade head
-  else
-    echo "The database does not require migrations."
-  fi
+# Apply migrations with the runner. Concurrent runs are serialized by an advisory lock
+# (see api/migrations/env.py), so every replica may do this safely; set
+# MIGRATE_ON_START=false when a single `python migrate.py` job runs the upgrade instead.
+if [ "${MIGRATE_ON_START:-true}" = "false" ]; then
+  echo "MIGRATE_ON_START is false. Skipping migration application."
+elif [ -f "migrate.py" ]; then
+  python migrate.py
 else
-  echo "Alembic or the configuration file not found. Skipping migration application."
+  echo "migrate.py not found. Skipping migration application."
 fi
+
+exec "$@"
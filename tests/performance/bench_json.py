@@ -0,0 +1,85 @@
+"""
+Benchmark of the JSON providers on org chart payloads.
+
+Usage (from the repository root):
+PYTHONPATH=api python -m tests.performance.bench_json [--sizes 1000 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from app.json_provider import JSONProvider, OrjsonProvider, orjson
+from app.users.models import Role
+
+ROLES = list(Role)
+
+
+def make_payload(size: int) -> dict:
+    """
+    Build a chart-like payload with the field types of the User model.
+
+    Args:
+        size (int): Number of nodes.
+
+    Returns:
+        dict: The payload.
+    """
+    ids = [uuid.UUID(int=index + 1) for index in range(size)]
+    since = datetime(2020, 1, 1)
+    nodes = [
+        {
+            "id": ids[index],
+            "username": f"user{index}",
+            "email": f"user{index}@example.com",
+            "role": ROLES[index % len(ROLES)],
+            "employee_id": 100000 + index,
+            "member_since": since + timedelta(minutes=index),
+            "manager": ids[(index - 1) // 8] if index else None,
+        }
+        for index in range(size)
+    ]
+    return {"version": 1, "nodes": nodes}
+
+
+def bench(provider: JSONProvider, payload: dict, repeat: int) -> float:
+    """
+    Return the best time of building a JSON response for the payload.
+
+    Args:
+        provider (JSONProvider): The provider under test.
+        payload (dict): The payload to serialize.
+        repeat (int): Number of runs.
+
+    Returns:
+        float: The fastest run in seconds.
+    """
+    return min(timeit.repeat(lambda: provider.response(payload), number=1, repeat=repeat))
+
+
+def main() -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {"stdlib": JSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = OrjsonProvider(app)
+
+    print(f"{'nodes':>8} " + " ".join(f"{name:>12}" for name in providers) + f" {'speedup':>8}")
+    for size in args.sizes:
+        payload = make_payload(size)
+        timings = {name: bench(provider, payload, args.repeat) for name, provider in providers.items()}
+        speedup = timings["stdlib"] / timings["orjson"] if "orjson" in timings else 1.0
+        row = " ".join(f"{timing * 1000:>10.1f}ms" for timing in timings.values())
+        print(f"{size:>8} {row} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare two load test reports written by `runner.py`.
+
+Usage (from the repository root):
+python -m tests.performance.compare results/chart_browsing-A.json results/chart_browsing-B.json
+"""
+
+import argparse
+import json
+from typing import Iterator, Tuple
+
+METRICS = (
+    ("throughput", ("throughput",)),
+    ("errors", ("errors",)),
+    ("rate limited", ("rate_limited",)),
+    ("p50 ms", ("latency_ms", "p50")),
+    ("p95 ms", ("latency_ms", "p95")),
+    ("p99 ms", ("latency_ms", "p99")),
+    ("max ms", ("latency_ms", "max")),
+)
+
+
+def compare(baseline: dict, candidate: dict) -> Iterator[Tuple[str, float, float, str]]:
+    """
+    Compare the headline metrics of two reports.
+
+    Args:
+        baseline (dict): The earlier report.
+        candidate (dict): The report to compare with it.
+
+    Yields:
+        Tuple[str, float, float, str]: Metric name, both values and the relative change.
+    """
+    for name, path in METRICS:
+        before, after = baseline, candidate
+        for key in path:
+            before, after = before.get(key, 0), after.get(key, 0)
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        yield name, before, after, change
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two load test reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.candidate) as file:
+        candidate = json.load(file)
+    if baseline["scenario"] != candidate["scenario"] or baseline["config"] != candidate["config"]:
+        print("Warning: the reports were produced with different scenarios or settings.")
+    before_label, after_label = baseline.get("commit") or "baseline", candidate.get("commit") or "candidate"
+    print(f"{'metric':<14}{before_label:>14}{after_label:>14}{'change':>10}")
+    for name, before, after, change in compare(baseline, candidate):
+        print(f"{name:<14}{before:>14}{after:>14}{change:>10}")
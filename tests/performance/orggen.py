@@ -0,0 +1,181 @@
+"""
+Deterministic generator of synthetic organizations for load tests.
+
+The same seed, headcount, depth and fan-out always produce the same people, public ids
+and reporting lines, so results of different runs are comparable. Every generated user
+shares the password `LOADTEST_PASSWORD`.
+
+Usage (from the repository root, against the docker-compose database):
+LOADTEST_DATABASE_URL=postgresql+psycopg2://<user>:<password>@localhost:5433/<database> \
+PYTHONPATH=api python -m tests.performance.orggen --headcount 10000 --depth 6 --fanout 7 [--reset]
+"""
+
+import argparse
+import os
+import random
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+
+import bcrypt
+from sqlalchemy import create_engine, func, insert, select, text
+
+from app.org.changefeed import CHANNEL, encode_payload
+from app.users.models import Role, User
+
+LOADTEST_PASSWORD = "load-test-password"
+INSERT_BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class Person:
+    """A generated person; `id` and `manager_id` are the row ids used when seeding."""
+
+    id: int
+    public_id: uuid.UUID
+    username: str
+    email: str
+    role: Role
+    employee_id: int
+    manager_id: Optional[int]
+    level: int
+
+
+def generate_org(headcount: int, depth: int, fanout: int, seed: int = 0) -> List[Person]:
+    """
+    Generate a single-rooted organization.
+
+    Managers are filled breadth-first with between 1 and `2 * fanout - 1` direct reports
+    each, so the average span is `fanout`. Once `depth` levels are full, the remaining
+    people are spread over the managers above the bottom level.
+
+    Args:
+        headcount (int): Number of people.
+        depth (int): Maximum number of levels below the root.
+        fanout (int): Average number of direct reports per manager.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        List[Person]: The people, ordered by level.
+
+    Raises:
+        ValueError: If the parameters cannot produce an organization.
+    """
+    if headcount < 1 or fanout < 1 or (depth < 1 and headcount > 1):
+        raise ValueError("headcount and fanout must be positive and depth must allow more than one person.")
+
+    rng = random.Random(seed)
+    levels = [0]
+    managers = [None]
+    queue = deque([0])
+    eligible = None
+    while len(levels) < headcount:
+        if queue:
+            manager = queue.popleft()
+            if levels[manager] >= depth:
+                continue
+            reports = rng.randint(1, 2 * fanout - 1)
+        else:
+            if eligible is None:
+                eligible = [index for index, level in enumerate(levels) if level < depth]
+            manager = rng.choice(eligible)
+            reports = 1
+        for _ in range(min(reports, headcount - len(levels))):
+            levels.append(levels[manager] + 1)
+            managers.append(manager)
+            queue.append(len(levels) - 1)
+
+    people = []
+    for index, (level, manager) in enumerate(zip(levels, managers)):
+        if index == 0:
+            role = Role.admin
+        else:
+            role = Role.hr if rng.random() < 0.02 else Role.employee
+        people.append(
+            Person(
+                id=index + 1,
+                public_id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                username=f"user{index:07d}",
+                email=f"user{index:07d}@loadtest.example.com",
+                role=role,
+                employee_id=100000 + index,
+                manager_id=manager + 1 if manager is not None else None,
+                level=level,
+            )
+        )
+    return people
+
+
+def seed_database(database_url: str, people: List[Person], reset: bool = False, log_rounds: int = 12) -> None:
+    """
+    Insert the people into the users table and announce the new org version.
+
+    The password is hashed once; all users share the hash, so seeding is fast while
+    logins still pay the full bcrypt cost.
+
+    Args:
+        database_url (str): SQLAlchemy URL of the database.
+        people (List[Person]): The generated people.
+        reset (bool): Delete all existing users and their history first.
+        log_rounds (int): The bcrypt cost factor, matching the API's `BCRYPT_LOG_ROUNDS`.
+
+    Raises:
+        RuntimeError: If the users table is not empty and `reset` is not set.
+    """
+    password_hash = bcrypt.hashpw(LOADTEST_PASSWORD.encode("utf-8"), bcrypt.gensalt(log_rounds)).decode("utf-8")
+    table = User.__table__
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        if reset:
+            connection.execute(text("TRUNCATE users, user_versions, org_snapshots RESTART IDENTITY"))
+        elif connection.execute(select(func.count()).select_from(table)).scalar():
+            raise RuntimeError("The users table is not empty; pass --reset to replace its contents.")
+
+        rows = [
+            {
+                "id": person.id,
+                "public_id": person.public_id,
+                "username": person.username,
+                "email": person.email,
+                "role": person.role,
+                "password_hash": password_hash,
+                "employee_id": person.employee_id,
+                "manager_id": person.manager_id,
+            }
+            for person in people
+        ]
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            connection.execute(insert(table), rows[start : start + INSERT_BATCH_SIZE])
+        connection.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))"))
+
+        # The API hooks are bypassed here, so bump the org version and notify the workers by hand.
+        version = connection.execute(
+            text(
+                "UPDATE org_state SET version = version + 1, changed_at = timezone('utc', now()) "
+                "WHERE id = 1 RETURNING version"
+            )
+        ).scalar_one()
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": encode_payload(version, (person.id for person in people))},
+        )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database with a synthetic organization.")
+    parser.add_argument("--headcount", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--fanout", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=os.environ.get("LOADTEST_DATABASE_URL"))
+    parser.add_argument("--log-rounds", type=int, default=12)
+    parser.add_argument("--reset", action="store_true", help="replace existing users")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("set LOADTEST_DATABASE_URL or pass --database-url")
+
+    org = generate_org(args.headcount, args.depth, args.fanout, args.seed)
+    seed_database(args.database_url, org, reset=args.reset, log_rounds=args.log_rounds)
+    print(f"Seeded {len(org)} people over {max(person.level for person in org) + 1} levels.")
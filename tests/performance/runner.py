@@ -0,0 +1,261 @@
+"""
+Load test runner.
+
+Runs one scenario against a running stack, by default the docker-compose stack behind
+nginx on http://localhost, with a fixed number of concurrent keep-alive clients. Latency
+percentiles and throughput are written to a JSON report, which `compare.py` diffs
+against an earlier run.
+
+All simulated clients share one address, so the stack should be started with the rate
+limits raised, e.g. `RATELIMIT_BUCKET_SCALE=1000 docker compose up`. Responses rejected
+with 429 are reported as `rate_limited` and left out of the latency figures.
+
+Usage (from the repository root, after seeding with `orggen`):
+python -m tests.performance.runner --scenario chart_browsing [--concurrency 32] [--duration 60] [--seed 0]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from tests.performance.scenarios import SCENARIOS, OrgSample, Request
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PERCENTILES = (50, 95, 99)
+
+
+class Client:
+    """One simulated client with its own keep-alive connection and ETag cache."""
+
+    def __init__(self, base_url: str, timeout: float = 30) -> None:
+        url = urlsplit(base_url)
+        self._connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self._netloc = url.netloc
+        self._timeout = timeout
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._etags: Dict[str, str] = {}
+
+    def send(self, request: Request) -> Tuple[int, bytes]:
+        """
+        Send a request and read the whole response.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Tuple[int, bytes]: The status code and the body.
+        """
+        headers = {"Accept-Encoding": "gzip, br", **request.headers}
+        if request.conditional and request.path in self._etags:
+            headers["If-None-Match"] = self._etags[request.path]
+        try:
+            if self._connection is None:
+                self._connection = self._connection_class(self._netloc, timeout=self._timeout)
+                self._connection.connect()
+                # Without this, small requests wait for delayed ACKs and latencies measure the TCP stack.
+                self._connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._connection.request(request.method, request.path, body=request.body, headers=headers)
+            response = self._connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if request.conditional and response.getheader("ETag"):
+            self._etags[request.path] = response.getheader("ETag")
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        return response.status, body
+
+    def close(self) -> None:
+        """Close the connection; the next request opens a new one."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        sorted_values (Sequence[float]): The values in ascending order.
+        percent (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0 for no values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: List[float], statuses: Counter, errors: int, elapsed: float) -> dict:
+    """
+    Build the report figures of a run.
+
+    Args:
+        latencies (List[float]): Latencies of the served requests in seconds, i.e. without 429s.
+        statuses (Counter): Number of responses per status code.
+        errors (int): Requests that failed or returned a server error.
+        elapsed (float): Duration of the measured part of the run in seconds.
+
+    Returns:
+        dict: Request counts, throughput and latency figures in milliseconds.
+    """
+    latencies = sorted(latencies)
+    report = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rate_limited": statuses.get(429, 0),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "latency_ms": {f"p{value}": round(percentile(latencies, value) * 1000, 2) for value in PERCENTILES},
+    }
+    report["latency_ms"]["mean"] = round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0
+    report["latency_ms"]["max"] = round(latencies[-1] * 1000, 2) if latencies else 0.0
+    return report
+
+
+def sample_org(base_url: str) -> OrgSample:
+    """
+    Fetch the whole chart once to learn who can be addressed.
+
+    Args:
+        base_url (str): Base URL of the API.
+
+    Returns:
+        OrgSample: The people in the org.
+
+    Raises:
+        RuntimeError: If the chart cannot be fetched or is empty.
+    """
+    client = Client(base_url, timeout=120)
+    status, body = client.send(Request("GET", "/org/chart", headers={"Accept-Encoding": "identity"}))
+    client.close()
+    if status != 200:
+        raise RuntimeError(f"GET /org/chart returned {status}.")
+    org = OrgSample.from_chart(json.loads(body))
+    if not org.ids:
+        raise RuntimeError("The org is empty; seed it with tests.performance.orggen first.")
+    return org
+
+
+def run(base_url: str, scenario: str, concurrency: int, duration: float, warmup: float, seed: int) -> dict:
+    """
+    Run a scenario and measure it.
+
+    Args:
+        base_url (str): Base URL of the API.
+        scenario (str): Name of the scenario in `SCENARIOS`.
+        concurrency (int): Number of concurrent clients.
+        duration (float): Seconds to measure.
+        warmup (float): Seconds to run before measuring.
+        seed (int): Seed of the request streams; client `i` uses `seed + i`.
+
+    Returns:
+        dict: The report.
+    """
+    org = sample_org(base_url)
+    lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    started = time.monotonic()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    def simulate(index: int) -> None:
+        nonlocal errors
+        client = Client(base_url)
+        requests = SCENARIOS[scenario](org, random.Random(seed + index))
+        local_latencies, local_statuses, local_errors = [], Counter(), 0
+        while True:
+            request_started = time.monotonic()
+            if request_started >= deadline:
+                break
+            try:
+                status, _ = client.send(next(requests))
+            except (OSError, http.client.HTTPException):
+                status = None
+            finished = time.monotonic()
+            if request_started < measure_from:
+                continue
+            if status is None or status >= 500:
+                local_errors += 1
+            if status is not None:
+                local_statuses[status] += 1
+                if status != 429:
+                    local_latencies.append(finished - request_started)
+        client.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            errors += local_errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(simulate, range(concurrency)))
+    elapsed = min(time.monotonic(), deadline) - measure_from
+
+    return {
+        "scenario": scenario,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "config": {
+            "base_url": base_url,
+            "concurrency": concurrency,
+            "duration": duration,
+            "warmup": warmup,
+            "seed": seed,
+            "headcount": len(org.ids),
+        },
+        **summarize(latencies, statuses, errors, elapsed),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a load test scenario.")
+    parser.add_argument("--base-url", default=os.environ.get("LOADTEST_BASE_URL", "http://localhost"))
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="report path; defaults to results/<scenario>-<timestamp>.json")
+    args = parser.parse_args()
+
+    report = run(args.base_url, args.scenario, args.concurrency, args.duration, args.warmup, args.seed)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{args.scenario}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    latency = report["latency_ms"]
+    print(
+        f"{args.scenario}: {report['requests']} requests, {report['errors']} errors, "
+        f"{report['rate_limited']} rate limited, {report['throughput']} req/s, "
+        f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms -> {output}"
+    )
+    if report["rate_limited"]:
+        print("Warning: requests were rate limited; raise RATELIMIT_BUCKET_SCALE on the stack under test.")
@@ -0,0 +1,87 @@
+"""
+Load test scenarios.
+
+Every scenario turns a random generator into an endless stream of requests, one stream
+per simulated client. The org is sampled once from `/org/chart` before the run, so the
+scenarios address people that actually exist.
+"""
+
+import json
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from tests.performance.orggen import LOADTEST_PASSWORD
+
+
+@dataclass
+class Request:
+    """A single request of a scenario."""
+
+    method: str
+    path: str
+    body: Optional[bytes] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    conditional: bool = False
+
+
+@dataclass
+class OrgSample:
+    """The people known to the API at the start of a run."""
+
+    ids: List[str]
+    emails: List[str]
+    usernames: List[str]
+
+    @classmethod
+    def from_chart(cls, chart: dict) -> "OrgSample":
+        """
+        Build the sample from an `/org/chart` response.
+
+        Args:
+            chart (dict): The decoded response.
+
+        Returns:
+            OrgSample: The sample, ordered by public id for reproducibility.
+        """
+        nodes = sorted(chart["nodes"], key=lambda node: node["id"])
+        return cls(
+            ids=[node["id"] for node in nodes],
+            emails=[node["email"] for node in nodes],
+            usernames=[node["username"] for node in nodes if node["username"]],
+        )
+
+
+def login_storm(org: OrgSample, rng: random.Random) -> Iterator[Request]:
+    """Many people logging in at once, e.g. at the start of the working day."""
+    while True:
+        body = json.dumps({"email": rng.choice(org.emails), "password": LOADTEST_PASSWORD}).encode("utf-8")
+        yield Request("POST", "/users/login", body, {"Content-Type": "application/json"})
+
+
+def chart_browsing(org: OrgSample, rng: random.Random) -> Iterator[Request]:
+    """Opening the chart at random people and expanding two levels, revalidating with ETags."""
+    while True:
+        yield Request("GET", f"/org/chart?root={rng.choice(org.ids)}&depth=2", conditional=True)
+
+
+def search_typeahead(org: OrgSample, rng: random.Random) -> Iterator[Request]:
+    """Typing a name letter by letter, one search request per keystroke."""
+    while True:
+        name = rng.choice(org.usernames)
+        for length in range(1, len(name) + 1):
+            yield Request("GET", f"/org/search?q={name[:length]}")
+
+
+def export(org: OrgSample, rng: random.Random) -> Iterator[Request]:
+    """Downloading the full CSV export."""
+    while True:
+        yield Request("GET", "/org/export")
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "chart_browsing": chart_browsing,
+    "search_typeahead": search_typeahead,
+    "export": export,
+}
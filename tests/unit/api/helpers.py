@@ -0,0 +1,86 @@
+"""Builders shared by the org tests."""
+
+import random
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.org.snapshot import OrgNode, OrgSnapshot
+from app.users.models import Role
+
+
+def make_snapshot(version: int, parents: Dict[int, Optional[int]]) -> OrgSnapshot:
+    """
+    Build an org snapshot from a `{id: manager_id}` mapping.
+
+    Args:
+        version (int): The org version of the snapshot.
+        parents (Dict[int, Optional[int]]): Manager id of every node id.
+
+    Returns:
+        OrgSnapshot: The snapshot.
+    """
+    nodes = [
+        OrgNode(
+            node_id, uuid.UUID(int=node_id), f"user{node_id}", f"user{node_id}@example.com", Role.employee, None, parent
+        )
+        for node_id, parent in parents.items()
+    ]
+    return OrgSnapshot(version, datetime(2026, 1, 1), nodes)
+
+
+def chain_of(parents: Dict[int, Optional[int]], node_id: int) -> List[int]:
+    """
+    Walk a `{id: manager_id}` mapping up from a node.
+
+    Args:
+        parents (Dict[int, Optional[int]]): Manager id of every node id.
+        node_id (int): The node to start from.
+
+    Returns:
+        List[int]: The node itself first, its root last.
+    """
+    chain = []
+    while node_id is not None:
+        chain.append(node_id)
+        node_id = parents[node_id]
+    return chain
+
+
+def random_changes(seed: int, versions: int) -> Iterator[Tuple[int, Dict[int, Optional[int]], Set[int]]]:
+    """
+    Hire, move and remove people at random, one to three changes per version.
+
+    The yielded mapping is updated in place, so copy it to keep an earlier version.
+
+    Args:
+        seed (int): Seed of the random generator.
+        versions (int): Number of versions to produce, starting from a lone root at version 0.
+
+    Yields:
+        Tuple[int, Dict[int, Optional[int]], Set[int]]: The version, the `{id: manager_id}` mapping
+            and the ids the change feed would report.
+    """
+    rng = random.Random(seed)
+    parents: Dict[int, Optional[int]] = {1: None}
+    yield 0, parents, set()
+
+    for version in range(1, versions):
+        changed = set()
+        for _ in range(rng.randint(1, 3)):
+            action = rng.random()
+            if action < 0.5 or len(parents) < 3:
+                node_id = max(parents) + 1
+                parents[node_id] = rng.choice(list(parents))
+            elif action < 0.8:
+                node_id = rng.choice(list(parents))
+                # Never move someone below their own reports.
+                candidates = [other for other in parents if node_id not in chain_of(parents, other)]
+                parents[node_id] = rng.choice([None, *candidates])
+            else:
+                node_id = rng.choice(list(parents))
+                del parents[node_id]
+                # Mimic ON DELETE SET NULL, which the change feed does not report.
+                parents.update({child: None for child, parent in parents.items() if parent == node_id})
+            changed.add(node_id)
+        yield version, parents, changed
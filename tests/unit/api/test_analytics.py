@@ -0,0 +1,73 @@
+import numpy as np
+
+from tests.unit.api.helpers import make_snapshot, random_changes
+
+from app.org.analytics import OrgAnalytics, compute_aggregates
+
+
+def test_compute_aggregates() -> None:
+    """Test the vectorized recompute on a small tree: 0 <- 1 <- 3, 0 <- 2."""
+    aggregates = compute_aggregates(np.array([-1, 0, 0, 1]))
+
+    assert aggregates.depth.tolist() == [0, 1, 1, 2]
+    assert aggregates.headcount.tolist() == [4, 2, 1, 1]
+    assert aggregates.direct_reports.tolist() == [2, 1, 0, 0]
+
+
+def test_compute_aggregates_breaks_cycles() -> None:
+    """Test that nodes caught in a reporting cycle are counted as roots."""
+    aggregates = compute_aggregates(np.array([1, 0, -1]))
+
+    assert aggregates.depth.tolist() == [0, 0, 0]
+    assert aggregates.headcount.tolist() == [1, 1, 1]
+
+
+def test_incremental_matches_full_recompute() -> None:
+    """Test random hires, moves and exits against a full recompute after every change."""
+    changes = random_changes(seed=26, versions=300)
+    _, parents, _ = next(changes)
+    analytics = OrgAnalytics()
+    old = make_snapshot(0, parents)
+    analytics.rebuild(old)
+
+    for version, parents, changed in changes:
+        new = make_snapshot(version, parents)
+        analytics.apply(old, new, changed)
+        old = new
+
+        assert analytics.version == version
+        assert analytics.verify(new) == []
+
+
+def test_summary() -> None:
+    """Test the org-wide summary of a small tree."""
+    analytics = OrgAnalytics()
+    summary = analytics.summary(make_snapshot(1, {1: None, 2: 1, 3: 1, 4: 2}))
+
+    assert summary["headcount"] == 4
+    assert summary["managers"] == 2
+    assert summary["average_span"] == 1.5
+    assert summary["max_depth"] == 2
+    assert summary["span_of_control"] == {1: 1, 2: 1}
+    assert analytics.node(2) == {"headcount": 2, "direct_reports": 1, "depth": 1}
+
+
+def test_pinned_follows_snapshot() -> None:
+    """Test that pinning to another snapshot rebuilds the aggregates before they are read."""
+    analytics = OrgAnalytics()
+    analytics.rebuild(make_snapshot(1, {1: None, 2: 1, 3: 2}))
+
+    with analytics.pinned(make_snapshot(2, {1: None, 3: 1})) as aggregates:
+        assert aggregates.summary(make_snapshot(2, {1: None, 3: 1}))["headcount"] == 2
+        assert aggregates.node(3) == {"headcount": 1, "direct_reports": 0, "depth": 1}
+
+
+def test_pinned_keeps_newer_aggregates() -> None:
+    """Test that an older snapshot does not roll the aggregates back."""
+    analytics = OrgAnalytics()
+    newer = make_snapshot(4, {1: None, 2: 1})
+    analytics.rebuild(newer)
+
+    with analytics.pinned(make_snapshot(3, {1: None})) as aggregates:
+        assert aggregates.snapshot is newer
+        assert aggregates.summary(aggregates.snapshot)["headcount"] == 2
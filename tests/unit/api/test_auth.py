@@ -0,0 +1,45 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from flask import Flask
+from werkzeug.exceptions import Unauthorized
+
+from app.users.auth import check_role, issue_token, read_token
+from app.users.models import Role, User
+
+
+def test_token_round_trip(app: Flask) -> None:
+    """Test that a token names the user it was issued for."""
+    user = User(public_id=uuid.uuid4())
+
+    assert read_token(issue_token(user)) == user.public_id
+
+
+def test_tampered_token(app: Flask) -> None:
+    """Test that changed, truncated or foreign tokens are rejected."""
+    token = issue_token(User(public_id=uuid.uuid4()))
+    payload, _, signature = token.rpartition(".")
+    forged = payload.replace(payload[0], "A" if payload[0] != "A" else "B", 1)
+
+    assert read_token(f"{forged}.{signature}") is None
+    assert read_token(token[:-2]) is None
+    assert read_token("not a token") is None
+    app.config["SECRET_KEY"] = "another secret"
+    assert read_token(token) is None
+
+
+def test_expired_token(app: Flask) -> None:
+    """Test that tokens older than JWT_ACCESS_TOKEN_EXPIRES are rejected."""
+    token = issue_token(User(public_id=uuid.uuid4()))
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(seconds=-1)
+
+    assert read_token(token) is None
+
+
+def test_check_role_without_valid_token(app: Flask) -> None:
+    """Test 401 for requests without a token or with a forged one."""
+    for headers in ({}, {"Authorization": "Bearer forged"}, {"Authorization": "Basic dXNlcjpwdw=="}):
+        with app.test_request_context(headers=headers):
+            with pytest.raises(Unauthorized):
+                check_role(Role.admin)
@@ -0,0 +1,70 @@
+import random
+
+from tests.unit.api.helpers import chain_of, make_snapshot, random_changes
+
+from app.org.chains import ManagementChains
+
+
+def naive_lca(parents: dict, a: int, b: int):
+    """Find the lowest common manager by walking both chains."""
+    chain_a = chain_of(parents, a)
+    return next((node for node in chain_of(parents, b) if node in chain_a), None)
+
+
+def test_queries() -> None:
+    """Test LCA, chain membership and paths on a small forest: 1 <- 2 <- 4, 1 <- 3, 5."""
+    chains = ManagementChains()
+    chains.rebuild(make_snapshot(1, {1: None, 2: 1, 3: 1, 4: 2, 5: None}))
+
+    assert chains.lowest_common_managers([4, 4, 2, 4], [3, 2, 2, 5]) == [1, 2, 2, None]
+    assert chains.in_chain([1, 2, 4, 3, 4], [4, 4, 4, 4, 1]) == [True, True, False, False, False]
+    assert chains.chain(4) == [2, 1]
+    assert chains.path(4, 3) == [4, 2, 1, 3]
+    assert chains.path(2, 4) == [2, 4]
+    assert chains.path(4, 5) is None
+
+
+def test_incremental_matches_naive_walk() -> None:
+    """Test random hires, moves and exits against walking the tree after every change."""
+    rng = random.Random(36)
+    changes = random_changes(seed=36, versions=200)
+    _, parents, _ = next(changes)
+    chains = ManagementChains()
+    old = make_snapshot(0, parents)
+    chains.rebuild(old)
+
+    for version, parents, changed in changes:
+        new = make_snapshot(version, parents)
+        chains.apply(old, new, changed)
+        old = new
+        assert chains.version == version
+
+        ids = list(parents)
+        first, second = [rng.choice(ids) for _ in range(50)], [rng.choice(ids) for _ in range(50)]
+        assert chains.lowest_common_managers(first, second) == [naive_lca(parents, a, b) for a, b in zip(first, second)]
+        assert chains.in_chain(first, second) == [a in chain_of(parents, b)[1:] for a, b in zip(first, second)]
+        assert all(chains.chain(node_id) == chain_of(parents, node_id)[1:] for node_id in ids)
+
+
+def test_pinned_moves_forward_only(monkeypatch) -> None:
+    """Test that pinning applies the next version incrementally and never rebuilds backwards."""
+    chains = ManagementChains()
+    first, second = make_snapshot(1, {1: None, 2: 1, 3: 2}), make_snapshot(2, {1: None, 2: 1, 3: 1, 4: 3})
+    chains.rebuild(first)
+
+    def fail(snapshot) -> None:
+        raise AssertionError("rebuilt")
+
+    monkeypatch.setattr(chains, "rebuild", fail)
+    with chains.pinned(second) as pinned:
+        assert pinned.snapshot is second
+        assert pinned.chain(4) == [3, 1]
+    with chains.pinned(first) as pinned:
+        assert pinned.snapshot is second
+    chains.apply(first, second, {3, 4})
+    assert chains.version == 2
+
+    monkeypatch.undo()
+    with chains.pinned(make_snapshot(5, {1: None, 2: 1})) as pinned:
+        assert pinned.version == 5
+        assert pinned.chain(2) == [1]
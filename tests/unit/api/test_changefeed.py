@@ -0,0 +1,95 @@
+import importlib
+import uuid
+
+import pytest
+
+from tests.unit.api.helpers import make_snapshot
+
+from app.org.changefeed import Broadcaster, ChangeFeed, build_diff, decode_payload, encode_payload
+
+
+def test_payload_round_trip() -> None:
+    """Test that changed ids survive encoding, deduplicated and sorted."""
+    assert decode_payload(encode_payload(7, [3, 1, 3])) == (7, [1, 3])
+
+
+def test_payload_overflow_requests_full_resync() -> None:
+    """Test that payloads above the NOTIFY limit drop the ids instead of failing."""
+    assert decode_payload(encode_payload(8, range(10_000))) == (8, None)
+
+
+def test_diff_upserts_and_deletes() -> None:
+    """Test that a diff carries changed nodes and detached reports of a removed manager."""
+    old = make_snapshot(1, {1: None, 2: 1, 3: 2})
+    new = make_snapshot(2, {1: None, 3: None, 4: 1})
+
+    diff = build_diff(old, new, [2, 4])
+
+    assert diff["version"] == 2
+    assert diff["deletes"] == [uuid.UUID(int=2)]
+    assert {node["id"] for node in diff["upserts"]} == {uuid.UUID(int=3), uuid.UUID(int=4)}
+
+
+def test_diff_without_ids_is_reset() -> None:
+    """Test that an unknown change set results in a reset message."""
+    snapshot = make_snapshot(3, {1: None})
+    assert build_diff(snapshot, snapshot, None) == {"version": 3, "reset": True}
+
+
+def test_broadcaster_replaces_backlog_of_slow_subscriber() -> None:
+    """Test that a subscriber that falls behind gets a single reset message."""
+    broadcaster = Broadcaster(maxsize=2)
+    subscription = broadcaster.subscribe()
+    for version in range(1, 4):
+        broadcaster.publish({"version": version})
+
+    assert subscription.get_nowait() == {"version": 3, "reset": True}
+    assert subscription.empty()
+
+    broadcaster.unsubscribe(subscription)
+    assert len(broadcaster) == 0
+
+
+def test_broadcaster_refuses_subscribers_over_limit() -> None:
+    """Test that subscribing over the limit is refused until a slot is freed."""
+    broadcaster = Broadcaster()
+    first = broadcaster.subscribe(limit=1)
+
+    assert first is not None
+    assert broadcaster.subscribe(limit=1) is None
+
+    broadcaster.unsubscribe(first)
+    assert broadcaster.subscribe(limit=1) is not None
+
+
+def test_reconnect_delay_resets_after_listening(monkeypatch) -> None:
+    """Test that the reconnect delay doubles while connecting fails and starts over once LISTEN succeeds."""
+
+    class Stop(BaseException):
+        pass
+
+    outcomes = iter([False, False, False, True, False, True, True])
+    delays = []
+
+    def connect(app) -> object:  # noqa: U100
+        if not next(outcomes):
+            raise ConnectionError("connection refused")
+        return object()
+
+    def listen(app, raw_connection) -> None:  # noqa: U100
+        raise ConnectionError("connection reset")
+
+    def sleep(seconds: float) -> None:
+        delays.append(seconds)
+        if len(delays) == 7:
+            raise Stop
+
+    # `app.org.changefeed` is also the name of the extension instance, so fetch the module itself.
+    module = importlib.import_module("app.org.changefeed")
+    feed = ChangeFeed()
+    monkeypatch.setattr(feed, "_connect", connect)
+    monkeypatch.setattr(feed, "_listen", listen)
+    monkeypatch.setattr(module.time, "sleep", sleep)
+    with pytest.raises(Stop):
+        feed._run(None)
+    assert delays == [1, 2, 4, 1, 2, 1, 1]
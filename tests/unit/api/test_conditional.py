@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+from flask import Flask
+
+from app.org.conditional import is_not_modified, org_etag
+
+LAST_MODIFIED = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_matching_etag_is_not_modified(app: Flask) -> None:
+    """
+    Test that the current org ETag is recognized, also with a compression suffix.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    for header in ('W/"org-5"', '"org-5:gzip"', 'W/"org-4", W/"org-5:br"'):
+        with app.test_request_context(headers={"If-None-Match": header}):
+            assert is_not_modified(org_etag(5), LAST_MODIFIED), header
+
+
+def test_outdated_etag_is_modified(app: Flask) -> None:
+    """
+    Test that an ETag of an older org version does not match.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.test_request_context(headers={"If-None-Match": 'W/"org-4:gzip"'}):
+        assert not is_not_modified(org_etag(5), LAST_MODIFIED)
+
+
+def test_etag_takes_precedence_over_date(app: Flask) -> None:
+    """
+    Test that If-Modified-Since is ignored when If-None-Match is present.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    headers = {"If-None-Match": 'W/"org-4"', "If-Modified-Since": "Thu, 01 Jan 2026 13:00:00 GMT"}
+    with app.test_request_context(headers=headers):
+        assert not is_not_modified(org_etag(5), LAST_MODIFIED)
+
+
+def test_if_modified_since(app: Flask) -> None:
+    """
+    Test the date based validator.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    with app.test_request_context(headers={"If-Modified-Since": "Thu, 01 Jan 2026 12:00:00 GMT"}):
+        assert is_not_modified(org_etag(5), LAST_MODIFIED)
+    with app.test_request_context(headers={"If-Modified-Since": "Thu, 01 Jan 2026 11:59:59 GMT"}):
+        assert not is_not_modified(org_etag(5), LAST_MODIFIED)
@@ -0,0 +1,113 @@
+import uuid
+from collections import namedtuple
+from typing import List
+
+import pytest
+from flask import Flask
+
+from app.dataloader import DataLoader
+from app.users import auth
+from app.users.loader import AMBIGUOUS, users_by_key
+from app.users.models import Role, User
+from app.users.routes import RESOLVE_MAX_KEYS, parse_email, parse_employee_id
+
+
+def test_lookups_are_coalesced_and_deduplicated() -> None:
+    """Test that all keys requested before the first read are fetched in one batch, each once."""
+    batches: List[List[int]] = []
+
+    def batch_load(keys: List[int]) -> dict:
+        batches.append(keys)
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = DataLoader(batch_load)
+    deferred = loader.load_many([1, 2, 1, 3])
+    assert batches == []
+
+    assert [item.get() for item in deferred] == [10, 20, 10, None]
+    assert batches == [[1, 2, 3]]
+
+    assert loader.load(2).get() == 20
+    assert loader.load(4).get() == 40
+    assert batches == [[1, 2, 3], [4]]
+
+
+def test_prime_and_batch_size() -> None:
+    """Test that primed keys are not fetched and large batches are split."""
+    batches: List[List[int]] = []
+
+    def batch_load(keys: List[int]) -> dict:
+        batches.append(keys)
+        return {key: key for key in keys}
+
+    loader = DataLoader(batch_load, max_batch_size=2)
+    loader.prime(1, "known")
+    deferred = loader.load_many([1, 2, 3, 4, 5])
+
+    assert [item.get() for item in deferred] == ["known", 2, 3, 4, 5]
+    assert batches == [[2, 3], [4, 5]]
+
+
+@pytest.fixture()
+def signed_in(monkeypatch) -> None:
+    """Let requests act as a signed-in employee without a database."""
+    monkeypatch.setattr(auth, "current_user", lambda: User(role=Role.employee))
+
+
+def test_resolve_requires_token(app: Flask, monkeypatch) -> None:
+    """Test that resolving people needs a token of a user other than a guest."""
+    client = app.test_client()
+    assert client.post("/users/resolve", json={"emails": ["a@example.com"]}).status_code == 401
+
+    monkeypatch.setattr(auth, "current_user", lambda: User(role=Role.guest))
+    assert client.post("/users/resolve", json={"emails": ["a@example.com"]}).status_code == 403
+
+
+def test_resolve_validation(app: Flask, signed_in: None) -> None:
+    """Test that malformed resolve requests are rejected before any query."""
+    client = app.test_client()
+
+    assert client.post("/users/resolve", json={}).status_code == 400
+    assert client.post("/users/resolve", json={"emails": "a@example.com"}).status_code == 400
+    assert client.post("/users/resolve", json={"employee_ids": list(range(RESOLVE_MAX_KEYS + 1))}).status_code == 400
+
+
+def test_resolve_malformed_keys(app: Flask, signed_in: None) -> None:
+    """Test that keys which cannot exist resolve to null without a lookup."""
+    response = app.test_client().post(
+        "/users/resolve",
+        json={"public_ids": ["nope"], "employee_ids": ["x1", True], "emails": ["a\x00@example.com", "nobody"]},
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "public_ids": {"nope": None},
+        "employee_ids": {"x1": None, "True": None},
+        "emails": {"a\x00@example.com": None, "nobody": None},
+    }
+
+
+def test_ambiguous_keys() -> None:
+    """Test that a key matching several users is reported instead of resolving to one of them."""
+    Row = namedtuple("Row", "key public_id username email role employee_id manager")
+    rows = [Row(7, uuid.UUID(int=i), None, f"user{i}@example.com", Role.employee, 7, None) for i in (1, 2)]
+    rows.append(Row(8, uuid.UUID(int=3), None, "user3@example.com", Role.hr, 8, None))
+
+    users = users_by_key(rows)
+    assert users[7] == AMBIGUOUS
+    assert users[8]["id"] == uuid.UUID(int=3)
+
+
+def test_parse_email() -> None:
+    """Test that only emails which could be stored are looked up."""
+    assert parse_email("a@example.com") == "a@example.com"
+    for value in ["", "nobody", "a\x00@example.com", "a@" + "x" * 200, 42, None]:
+        assert parse_email(value) is None, value
+
+
+def test_parse_employee_id() -> None:
+    """Test that only ids fitting the integer column are accepted."""
+    assert parse_employee_id("42") == parse_employee_id(42) == 42
+    assert parse_employee_id(str(2**31 - 1)) == 2**31 - 1
+    for value in ["²", "١", "9" * 5000, str(2**31), 2**31, -1, "-1", " 1", "", 1.0, None]:
+        assert parse_employee_id(value) is None, value
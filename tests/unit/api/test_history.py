@@ -0,0 +1,92 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select
+from werkzeug.exceptions import BadRequest
+
+from app.org.history import HistoryNotAvailable, decode_nodes, encode_nodes, load_snapshot_as_of, take_snapshot
+from app.org.routes import parse_as_of
+from app.org.snapshot import OrgNode
+from app.users.models import Role, User
+
+
+def now(db: SQLAlchemy) -> datetime:
+    """
+    Return the database clock used by the history trigger.
+
+    Args:
+        db (SQLAlchemy): The SQLAlchemy database instance.
+
+    Returns:
+        datetime: The current time as naive UTC.
+    """
+    return db.session.execute(select(func.timezone("utc", func.clock_timestamp()))).scalar_one()
+
+
+def test_snapshot_payload_round_trip() -> None:
+    """Test that snapshot nodes survive compression unchanged."""
+    nodes = [
+        OrgNode(1, uuid.uuid4(), "boss", "boss@example.com", Role.admin, 7, None),
+        OrgNode(2, uuid.uuid4(), None, "alice@example.com", Role.employee, None, 1),
+    ]
+    assert decode_nodes(encode_nodes(nodes)) == {node.id: node for node in nodes}
+
+
+def test_parse_as_of(app: Flask) -> None:
+    """Test that dates mean the end of the day, offsets are normalized to UTC and bad values are 400s."""
+    assert parse_as_of("2026-03-01") == datetime(2026, 3, 1, 23, 59, 59, 999999)
+    assert parse_as_of("2026-03-01T12:00:00+02:00") == datetime(2026, 3, 1, 10)
+    assert parse_as_of("2026-03-01T12:00:00Z") == datetime(2026, 3, 1, 12)
+    for value in ["yesterday", "0001-01-01T00:00:00+14:00", "9999-12-31T23:59:59-14:00"]:
+        with pytest.raises(BadRequest):
+            parse_as_of(value)
+
+
+def test_org_as_of(db: SQLAlchemy) -> None:
+    """
+    Test that the org is reconstructed from a full snapshot plus replayed versions.
+
+    Args:
+        db (SQLAlchemy): The SQLAlchemy database instance.
+    """
+    session = db.session
+    before_history = now(db)
+    take_snapshot(session)
+    session.commit()
+    before_hires = now(db)
+
+    boss = User(public_id=uuid.uuid4(), email="boss@example.com", password_hash="x", role=Role.employee)
+    session.add(boss)
+    session.commit()
+    alice = User(public_id=uuid.uuid4(), email="alice@example.com", password_hash="x", manager_id=boss.id)
+    session.add(alice)
+    session.commit()
+    after_hires = now(db)
+
+    take_snapshot(session)
+    session.commit()
+
+    alice.manager_id = None
+    session.commit()
+    after_move = now(db)
+
+    session.delete(boss)
+    session.commit()
+    after_exit = now(db)
+
+    with pytest.raises(HistoryNotAvailable):
+        load_snapshot_as_of(session, before_history)
+    assert len(load_snapshot_as_of(session, before_hires)) == 0
+
+    org = load_snapshot_as_of(session, after_hires)
+    assert org.nodes[alice.id].manager_id == org.get(boss.public_id).id
+
+    org = load_snapshot_as_of(session, after_move)
+    assert org.nodes[alice.id].manager_id is None
+    assert org.get(boss.public_id) is not None
+
+    org = load_snapshot_as_of(session, after_exit)
+    assert list(org.nodes) == [alice.id]
@@ -0,0 +1,162 @@
+import time
+import uuid
+from typing import Generator
+
+import pytest
+from flask import Flask
+
+from tests.unit.api.helpers import make_snapshot
+
+import app.jobs.routes as job_routes
+from app.jobs import JobContext, jobs
+from app.org.jobs import find_cycle, tidy_layout
+from app.users.models import Role, User
+
+
+@pytest.fixture()
+def test_tasks(app: Flask) -> Generator:
+    """Register a counting and a failing task for the duration of a test."""
+
+    def count(context: JobContext, to: int) -> dict:
+        for done in range(1, to + 1):
+            context.progress(done, to)
+        return {"counted": to}
+
+    def fail(context: JobContext) -> None:
+        raise ValueError("broken input")
+
+    jobs.task("test.count")(count)
+    jobs.task("test.fail")(fail)
+    yield
+    del jobs.tasks["test.count"], jobs.tasks["test.fail"]
+
+
+def wait_for(client, location: str) -> dict:
+    """Poll a job until it is finished or failed."""
+    for _ in range(100):
+        job = client.get(location).get_json()
+        if job["status"] in ("finished", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("The job did not finish.")
+
+
+def test_job_lifecycle(app: Flask, test_tasks: None) -> None:
+    """Test enqueueing, polling and fetching the result of a job run in-process."""
+    client = app.test_client()
+    response = client.post("/jobs/test.count", json={"to": 3})
+
+    assert response.status_code == 202
+    job = wait_for(client, response.headers["Location"])
+    assert job["status"] == "finished"
+    assert job["progress"] == job["total"] == 3
+    assert client.get(job["result"]).get_json() == {"counted": 3}
+
+
+def test_failed_job(app: Flask, test_tasks: None) -> None:
+    """Test that a failing task marks its job as failed and has no result."""
+    client = app.test_client()
+    location = client.post("/jobs/test.fail").headers["Location"]
+
+    job = wait_for(client, location)
+    assert job["status"] == "failed"
+    assert job["error"] == "ValueError: broken input"
+    assert client.get(f"{location}/result").status_code == 409
+
+
+def test_result_that_cannot_be_stored(app: Flask, test_tasks: None, monkeypatch) -> None:
+    """Test that an error storing the result fails the job instead of leaving it running."""
+
+    def set_result(job_id: str, result: object, ttl: int) -> None:
+        raise TypeError("Object of type set is not JSON serializable")
+
+    monkeypatch.setattr(jobs.store, "set_result", set_result)
+    client = app.test_client()
+    job = wait_for(client, client.post("/jobs/test.count", json={"to": 1}).headers["Location"])
+
+    assert job["status"] == "failed"
+    assert job["error"] == "TypeError: Object of type set is not JSON serializable"
+
+
+def test_unknown_job(app: Flask) -> None:
+    """Test 404 for unknown tasks and jobs."""
+    client = app.test_client()
+
+    assert client.post("/jobs/no.such.task").status_code == 404
+    assert client.get("/jobs/0123456789abcdef").status_code == 404
+
+
+def test_invalid_params(app: Flask, test_tasks: None) -> None:
+    """Test 400 for parameters the task does not take, including ones named like enqueue's own."""
+    client = app.test_client()
+
+    assert client.post("/jobs/test.count", json={"to": 3, "bogus": 1}).status_code == 400
+    assert client.post("/jobs/test.count", json={"task": "x", "to": 3}).status_code == 400
+    assert client.post("/jobs/test.count", json={}).status_code == 400
+    assert client.post("/jobs/test.count", json=[3]).status_code == 400
+
+
+def test_export_params_checked_on_enqueue(app: Flask) -> None:
+    """Test that malformed export and layout parameters are 400s before any job is queued."""
+    client = app.test_client()
+    # Enqueueing is rate limited per client; keep these requests out of the other tests' bucket.
+    client.environ_base["HTTP_X_REAL_IP"] = "192.0.2.34"
+    for params in [
+        {"as_of": "yesterday"},
+        {"as_of": 20260101},
+        {"as_of": "0001-01-01T00:00:00+14:00"},
+        {"depth": -1},
+        {"depth": "2"},
+        {"root": "nobody"},
+        {"root": 7},
+    ]:
+        assert client.post("/jobs/org.export", json=params).status_code == 400, params
+    assert client.post("/jobs/org.layout", json={"depth": True}).status_code == 400
+
+
+def test_import_requires_token(app: Flask) -> None:
+    """Test that the org import cannot be started anonymously."""
+    client = app.test_client()
+
+    assert client.post("/jobs/org.import", json={"data": "email,manager\n"}).status_code == 401
+    assert client.post("/jobs/org.import", headers={"Authorization": "Bearer forged"}).status_code == 401
+
+
+def test_job_access(app: Flask, test_tasks: None, monkeypatch) -> None:
+    """Test that owned jobs and jobs of restricted tasks are only readable by their owner or the task's roles."""
+    jobs.task("test.restricted", roles=(Role.admin,))(lambda context: {"secret": True})
+    owner = User(public_id=uuid.uuid4(), role=Role.employee)
+    client = app.test_client()
+    try:
+        restricted = jobs.enqueue("test.restricted", owner=str(owner.public_id))
+        owned = jobs.enqueue("test.count", {"to": 1}, owner=str(owner.public_id))
+        anonymous = jobs.enqueue("test.count", {"to": 1})
+
+        assert client.get(f"/jobs/{restricted.id}").status_code == 401
+        assert client.get(f"/jobs/{restricted.id}/result").status_code == 401
+        assert client.get(f"/jobs/{owned.id}").status_code == 404
+        assert client.get(f"/jobs/{anonymous.id}").status_code == 200
+
+        monkeypatch.setattr(job_routes, "current_user", lambda: owner)
+        assert client.get(f"/jobs/{restricted.id}").status_code == 200
+        assert client.get(f"/jobs/{owned.id}").status_code == 200
+    finally:
+        del jobs.tasks["test.restricted"]
+
+
+def test_find_cycle() -> None:
+    """Test that only cycles through the changed people are reported."""
+    parents = {1: None, 2: 1, 3: 2, 4: 5, 5: 4}
+
+    assert find_cycle(parents, [3]) == []
+    assert sorted(find_cycle({**parents, 1: 3}, [1])) == [1, 2, 3]
+
+
+def test_tidy_layout() -> None:
+    """Test that leaves take one column each and managers are centred above their reports."""
+    parents = {1: None, 2: 1, 3: 1, 4: 2, 5: 2}
+    snapshot = make_snapshot(1, parents)
+    positions = tidy_layout(snapshot)
+
+    assert positions == {4: (0, 2), 5: (1, 2), 2: (0.5, 1), 3: (2, 1), 1: (1.25, 0)}
+    assert tidy_layout(snapshot, max_depth=1) == {2: (0, 1), 3: (1, 1), 1: (0.5, 0)}
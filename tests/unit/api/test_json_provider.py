@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from app.json_provider import JSONProvider, OrjsonProvider, orjson
+from app.users.models import Role
+
+PAYLOAD = {
+    "id": uuid.UUID("6f1f7a3e-9d4b-4c59-8a44-1b2f0c2d9e10"),
+    "role": Role.hr,
+    "member_since": datetime(2024, 1, 15, 21, 40, 56, 127317),
+    "last_login": None,
+    "employee_id": 42,
+}
+
+
+def test_stdlib_provider_handles_user_types(app: Flask) -> None:
+    """
+    Test that UUID, datetime and Role values are serialized by the stdlib provider.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    assert JSONProvider(app).loads(JSONProvider(app).dumps(PAYLOAD)) == {
+        "id": "6f1f7a3e-9d4b-4c59-8a44-1b2f0c2d9e10",
+        "role": "HR",
+        "member_since": "2024-01-15T21:40:56.127317",
+        "last_login": None,
+        "employee_id": 42,
+    }
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_provider_matches_stdlib(app: Flask) -> None:
+    """
+    Test that both providers produce the same document.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    assert OrjsonProvider(app).dumps(PAYLOAD) == JSONProvider(app).dumps(PAYLOAD, separators=(",", ":"))
+    assert OrjsonProvider(app).response(PAYLOAD).get_json() == JSONProvider(app).loads(JSONProvider(app).dumps(PAYLOAD))
+
+
+def test_app_uses_accelerated_provider(app: Flask) -> None:
+    """
+    Test that create_app registers orjson when it is available.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    assert isinstance(app.json, OrjsonProvider if orjson is not None else JSONProvider)
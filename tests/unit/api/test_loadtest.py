@@ -0,0 +1,72 @@
+import random
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from tests.performance.orggen import generate_org
+from tests.performance.runner import percentile, summarize
+from tests.performance.scenarios import OrgSample, search_typeahead
+
+from app.org.snapshot import OrgNode, OrgSnapshot
+
+
+def test_generate_org_is_deterministic() -> None:
+    """Test that the same parameters produce the same org within the requested shape."""
+    org = generate_org(headcount=2000, depth=4, fanout=5, seed=7)
+
+    assert org == generate_org(headcount=2000, depth=4, fanout=5, seed=7)
+    assert org != generate_org(headcount=2000, depth=4, fanout=5, seed=8)
+    assert len(org) == 2000
+    assert max(person.level for person in org) <= 4
+    assert [person.manager_id for person in org].count(None) == 1
+    assert len({person.public_id for person in org}) == 2000
+
+
+def test_generate_org_fills_shallow_orgs() -> None:
+    """Test that the headcount is reached even when the depth limit is hit early."""
+    org = generate_org(headcount=500, depth=1, fanout=2, seed=0)
+
+    assert len(org) == 500
+    assert {person.level for person in org} == {0, 1}
+
+
+def test_search_typeahead_prefixes() -> None:
+    """Test that the type-ahead scenario sends one growing prefix per keystroke."""
+    org = OrgSample(ids=["a"], emails=["user1@example.com"], usernames=["bob"])
+    requests = search_typeahead(org, random.Random(0))
+
+    assert [next(requests).path for _ in range(4)] == [
+        "/org/search?q=b",
+        "/org/search?q=bo",
+        "/org/search?q=bob",
+        "/org/search?q=b",
+    ]
+
+
+def test_summarize() -> None:
+    """Test the percentile figures of a report."""
+    latencies = [index / 1000 for index in range(1, 101)]
+    report = summarize(latencies, Counter({200: 99, 503: 1, 429: 7}), errors=1, elapsed=10)
+
+    assert percentile(sorted(latencies), 50) == 0.05
+    assert report["requests"] == 100
+    assert report["throughput"] == 10
+    assert report["rate_limited"] == 7
+    assert report["statuses"] == {"200": 99, "429": 7, "503": 1}
+    assert report["latency_ms"]["p95"] == 95
+    assert report["latency_ms"]["p99"] == 99
+
+
+def test_snapshot_search() -> None:
+    """Test the case-insensitive prefix search on usernames and emails."""
+    nodes = [
+        OrgNode(1, uuid.UUID(int=1), "Alice", "alice@example.com", None, None, None),
+        OrgNode(2, uuid.UUID(int=2), "alfred", "fred@example.com", None, None, 1),
+        OrgNode(3, uuid.UUID(int=3), None, "bob@example.com", None, None, 1),
+    ]
+    snapshot = OrgSnapshot(1, datetime(2026, 1, 1), nodes)
+
+    assert [node.id for node in snapshot.search("AL")] == [2, 1]
+    assert [node.id for node in snapshot.search("fr")] == [2]
+    assert [node.id for node in snapshot.search("al", limit=1)] == [2]
+    assert snapshot.search("zz") == []
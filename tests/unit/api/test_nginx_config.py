@@ -0,0 +1,18 @@
+import re
+from pathlib import Path
+
+NGINX_DIR = Path(__file__).resolve().parents[3] / "nginx"
+INCLUDE = "include /etc/nginx/proxy_headers.conf;"
+
+
+def test_locations_setting_headers_keep_proxy_headers() -> None:
+    """Test that every location with its own proxy_set_header includes the shared proxy headers again."""
+    config = (NGINX_DIR / "nginx.conf").read_text()
+    locations = re.findall(r"location\s+([^{]+)\{([^}]*)\}", config)
+
+    assert locations
+    for name, body in locations:
+        if "proxy_set_header" in body:
+            assert INCLUDE in body, f"location {name.strip()} drops the server-level proxy headers"
+    assert "X-Real-IP" in (NGINX_DIR / "proxy_headers.conf").read_text()
+    assert "proxy_headers.conf" in (NGINX_DIR / "Dockerfile").read_text()
@@ -0,0 +1,124 @@
+import pytest
+from flask import Flask
+
+from tests.unit.api.helpers import make_snapshot
+
+import app.org.conditional as org_conditional
+import app.org.routes as org_routes
+from app.ratelimit import Limit, LocalBuckets, RateLimiter
+
+
+@pytest.fixture()
+def limited_app() -> Flask:
+    """Create a small app with a rate limited and a concurrency limited route."""
+    app = Flask(__name__)
+    app.config.update(RATELIMIT_DEFAULT=(0.001, 3), RATELIMIT_EXEMPT=("health",))
+    limiter = RateLimiter()
+    limiter.init_app(app)
+
+    @app.route("/health")
+    def health():
+        return "ok"
+
+    @app.route("/ping")
+    def ping():
+        return "pong"
+
+    @app.route("/login", methods=["POST"])
+    @limiter.limit(per_client=Limit(rate=0.001, burst=2))
+    def login():
+        return "ok"
+
+    @app.route("/export")
+    @limiter.limit(concurrency=1)
+    def export():
+        def body():
+            yield "done"
+
+        return app.response_class(body())
+
+    return app
+
+
+def test_local_buckets() -> None:
+    """Test that buckets allow the burst, then report the wait for the next token."""
+    buckets = LocalBuckets()
+    limit = Limit(rate=1, burst=2)
+
+    assert buckets.consume([("a", limit)]) == 0
+    assert buckets.consume([("a", limit)]) == 0
+    assert 0 < buckets.consume([("a", limit)]) <= 1
+    assert buckets.consume([("b", limit)]) == 0
+
+
+def test_local_buckets_all_or_nothing() -> None:
+    """Test that a request rejected by one bucket does not drain the others."""
+    buckets = LocalBuckets()
+    wide, narrow = Limit(rate=0.001, burst=2), Limit(rate=0.001, burst=1)
+
+    assert buckets.consume([("wide", wide), ("narrow", narrow)]) == 0
+    assert buckets.consume([("wide", wide), ("narrow", narrow)]) > 0
+    assert buckets.consume([("wide", wide)]) == 0
+
+
+def test_rate_limit_per_client(limited_app: Flask) -> None:
+    """Test 429 with Retry-After once a client has used up its bucket."""
+    client = limited_app.test_client()
+    headers = {"X-Real-IP": "10.0.0.1"}
+
+    assert client.post("/login", headers=headers).status_code == 200
+    assert client.post("/login", headers=headers).status_code == 200
+    response = client.post("/login", headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.post("/login", headers={"X-Real-IP": "10.0.0.2"}).status_code == 200
+
+
+def test_health_is_exempt(limited_app: Flask) -> None:
+    """Test that the default bucket applies to every endpoint except the exempt ones."""
+    client = limited_app.test_client()
+
+    assert [client.get("/ping").status_code for _ in range(4)] == [200, 200, 200, 429]
+    assert all(client.get("/health").status_code == 200 for _ in range(10))
+
+
+def test_concurrency_cap(limited_app: Flask) -> None:
+    """Test 503 while the only slot is held by a response that has not been sent completely."""
+    client = limited_app.test_client()
+    first = client.get("/export", buffered=False)
+
+    assert first.status_code == 200
+    assert client.get("/export").status_code == 503
+
+    assert first.get_data() == b"done"
+    first.close()
+    assert client.get("/export").status_code == 200
+
+
+def test_bucket_scale(limited_app: Flask) -> None:
+    """Test that RATELIMIT_BUCKET_SCALE raises every bucket, as load tests need."""
+    limited_app.config["RATELIMIT_BUCKET_SCALE"] = 3
+    client = limited_app.test_client()
+
+    assert [client.get("/ping").status_code for _ in range(10)] == [200] * 9 + [429]
+
+
+def test_export_limited_before_snapshot(app: Flask, monkeypatch) -> None:
+    """Test that a rate limited export is rejected before the org snapshot is loaded."""
+    loads = []
+
+    def get_snapshot():
+        loads.append(1)
+        return make_snapshot(1, {1: None})
+
+    monkeypatch.setattr(org_routes, "get_snapshot", get_snapshot)
+    monkeypatch.setattr(org_conditional, "get_snapshot", get_snapshot)
+    client = app.test_client()
+    client.environ_base["HTTP_X_REAL_IP"] = "192.0.2.33"
+
+    statuses = []
+    for _ in range(4):
+        with client.get("/org/export") as response:
+            statuses.append(response.status_code)
+    assert statuses == [200, 200, 200, 429]
+    assert len(loads) == 6
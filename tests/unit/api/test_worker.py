@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from typing import Generator
+
+import pytest
+from flask import Flask
+
+from app.jobs import JobContext
+from app.jobs.queue import FAILED, FINISHED, PENDING_TTL, RUNNING, Job, JobQueue, RedisStore
+from app.jobs.worker import Worker
+
+redis = pytest.importorskip("redis")
+
+
+@pytest.fixture()
+def queue(app: Flask) -> Generator:
+    """A job queue on the Redis database named by `TEST_REDIS_URL`, emptied before and after the test."""
+    url = os.environ.get("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("TEST_REDIS_URL is not set")
+    store = RedisStore(url)
+    try:
+        store.client.ping()
+    except redis.ConnectionError:
+        pytest.skip("Redis is not reachable")
+
+    def clear() -> None:
+        keys = list(store.client.scan_iter("jobs:*"))
+        if keys:
+            store.client.delete(*keys)
+
+    def count(context: JobContext, to: int, pause: float = 0) -> dict:
+        for done in range(1, to + 1):
+            time.sleep(pause)
+            context.progress(done, to)
+        return {"counted": to}
+
+    clear()
+    queue = JobQueue()
+    queue.store = store
+    queue.task("test.count")(count)
+    yield queue
+    clear()
+
+
+def run_worker(worker: Worker) -> threading.Thread:
+    """Run a worker on a background thread."""
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(queue: JobQueue, job_id: str, status: str) -> Job:
+    """Poll a job until it has the given status."""
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job is not None and job.status == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"The job did not become {status}.")
+
+
+def test_store_round_trip(queue: JobQueue) -> None:
+    """Test saving, updating and reserving jobs and storing results."""
+    store = queue.store
+    job = Job("test.count", {"to": 1})
+    store.save(job, PENDING_TTL)
+    store.push(job)
+
+    assert store.get(job.id) == job
+    store.update(job.id, status=RUNNING, progress=1)
+    assert (store.get(job.id).status, store.get(job.id).progress) == (RUNNING, 1)
+
+    assert store.reserve(timeout=1) == job.id
+    assert store.processing() == [job.id]
+    assert store.reserve(timeout=1) is None
+    store.set_result(job.id, {"counted": 1}, 60)
+    assert store.get_result(job.id) == {"counted": 1}
+
+    store.acknowledge(job.id)
+    assert store.processing() == []
+    assert store.get("unknown") is None
+
+
+def test_worker_runs_jobs(app: Flask, queue: JobQueue) -> None:
+    """Test that a worker executes queued jobs and keeps their heartbeat fresh while they run."""
+    app.config["JOBS_HEARTBEAT_INTERVAL"] = 0.05
+    worker = Worker(app, queue)
+    thread = run_worker(worker)
+    try:
+        job = queue.enqueue("test.count", {"to": 5, "pause": 0.05})
+        running = wait_for(queue, job.id, RUNNING)
+        time.sleep(0.15)
+        assert queue.get(job.id).heartbeat_at > running.heartbeat_at
+
+        finished = wait_for(queue, job.id, FINISHED)
+        assert finished.attempts == 1
+        assert queue.result(job.id) == {"counted": 5}
+    finally:
+        worker.stop()
+        thread.join(5)
+    assert queue.store.processing() == []
+
+
+def test_worker_survives_store_errors(app: Flask, queue: JobQueue, monkeypatch) -> None:
+    """Test that a job whose outcome cannot be written stays reserved and the worker goes on."""
+    store = queue.store
+    update = store.update
+    broken = queue.enqueue("test.count", {"to": 1})
+
+    def update_or_fail(job_id: str, ttl=None, **changes) -> None:
+        if job_id == broken.id and "finished_at" in changes:
+            raise redis.ConnectionError("connection reset")
+        update(job_id, ttl, **changes)
+
+    monkeypatch.setattr(store, "update", update_or_fail)
+    worker = Worker(app, queue, concurrency=1)
+    thread = run_worker(worker)
+    try:
+        job = queue.enqueue("test.count", {"to": 2})
+        wait_for(queue, job.id, FINISHED)
+    finally:
+        worker.stop()
+        thread.join(5)
+    assert store.processing() == [broken.id]
+    assert queue.get(broken.id).status == RUNNING
+
+
+def test_requeue_stale(app: Flask, queue: JobQueue) -> None:
+    """Test that jobs of a lost worker are requeued, and failed once they ran out of attempts."""
+    store = queue.store
+    worker = Worker(app, queue)
+    job = queue.enqueue("test.count", {"to": 1})
+    store.reserve(timeout=1)
+    store.update(job.id, status=RUNNING, attempts=1, started_at=time.time(), heartbeat_at=time.time())
+
+    worker.requeue_stale(stale_after=60, max_attempts=3)
+    assert store.processing() == [job.id]
+
+    store.update(job.id, heartbeat_at=time.time() - 120)
+    worker.requeue_stale(stale_after=60, max_attempts=3)
+    assert store.processing() == []
+    assert store.reserve(timeout=1) == job.id
+
+    store.update(job.id, attempts=3)
+    worker.requeue_stale(stale_after=60, max_attempts=3)
+    assert store.processing() == []
+    assert store.reserve(timeout=1) is None
+    assert (store.get(job.id).status, store.get(job.id).error) == (FAILED, "Worker lost")